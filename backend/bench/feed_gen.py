@@ -0,0 +1,107 @@
+# backend/bench/feed_gen.py
+
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+from backend.services.feed_ingest import VRSYNC_NS
+
+# ==============================================================================
+# 1. DADOS SINTÉTICOS
+# ==============================================================================
+
+TIPOLOGIAS = ["Apartamento", "Casa", "Casa em Condomínio", "Sobrado", "Geminado", "Terreno", "Sala Comercial"]
+NEIGHBORHOODS = ["Atiradores", "América", "Glória", "Saguaçu", "Bucarein", "Anita Garibaldi", "Costa e Silva", "Centro"]
+# Como no feed real: <Feature> em inglês e a lista de "Características" da descrição em português.
+FEATURES = [("BBQ", "Churrasqueira"), ("Pool", "Piscina"), ("Balcony", "Sacada / Varanda"), ("Elevator", "Elevador"),
+            ("Doorman", "Portaria 24h"), ("Maid's Quarters", "Área de Serviço"), ("Gourmet Area", "Espaço Gourmet"),
+            ("Cooling", "Ar Condicionado"), ("Fitness Room", "Espaço Fitness"), ("Party Room", "Salão de Festas"),
+            ("Playground", "Playground"), ("Fireplace", "Lareira")]
+# Características que aparecem só na descrição.
+DESCRIPTION_ONLY_FEATURES = ["Piso Porcelanato", "Lavabo", "Móveis Planejados", "Fechadura Eletrônica"]
+WORDS = ("imóvel amplo iluminado localização privilegiada próximo ao centro acabamento de alto padrão "
+         "sol da manhã vista definitiva condomínio completo rua tranquila ótima oportunidade").split()
+
+def _description(rng: random.Random, bullets: list) -> str:
+    """
+    Texto livre seguido da lista de características em HTML escapado, como no feed real.
+    """
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 120))).capitalize() + "."
+    bullets = "".join(f"\n• &nbsp;{bullet}<br>" for bullet in bullets)
+    return f"{text}\n<br />\n<br /><strong>Características:</strong><br>\n{bullets}"
+
+def _listing_xml(index: int, rng: random.Random) -> str:
+    tipologia = rng.choice(TIPOLOGIAS)
+    pairs = rng.sample(FEATURES, rng.randint(0, 6))
+    features = [feature for feature, _bullet in pairs]
+    bullets = [bullet for _feature, bullet in pairs] + rng.sample(DESCRIPTION_ONLY_FEATURES, rng.randint(0, 2))
+    bedrooms = rng.randint(1, 5)
+    area = rng.randint(35, 600)
+    neighborhood = rng.choice(NEIGHBORHOODS)
+    listing_id = str(100000 + index)
+
+    def el(tag: str, value, attrs: str = "") -> str:
+        return f"<{tag}{attrs}>{escape(str(value))}</{tag}>"
+
+    details = [
+        el("Tipologia", tipologia),
+        el("Description", _description(rng, bullets)),
+        el("ListPrice", rng.randrange(150_000, 5_000_000, 1000), ' currency="BRL"'),
+        el("ConstructedArea", area, ' unit="square metres"'),
+        el("LivingArea", area - rng.randint(0, 20), ' unit="square metres"'),
+        el("Bedrooms", bedrooms),
+        el("Bathrooms", rng.randint(1, bedrooms + 1)),
+        el("Suites", rng.randint(0, bedrooms)),
+        el("Garage", rng.randint(0, 4), ' type="Parking Space"'),
+        "<Features>" + "".join(el("Feature", feature) for feature in features) + "</Features>",
+    ]
+    if rng.random() < 0.4:
+        details.append(el("PropertyAdministrationFee", rng.randrange(200, 3000, 10), ' currency="BRL"'))
+    location = [
+        el("Neighborhood", neighborhood),
+        el("Address", f"Rua {rng.choice(NEIGHBORHOODS)}"),
+        el("StreetNumber", rng.randint(1, 3000)),
+        el("PostalCode", f"89{rng.randint(200, 239)}-{rng.randint(0, 999):03d}"),
+    ]
+    slug = f"{tipologia.lower().replace(' ', '-')}-{neighborhood.lower().replace(' ', '-')}-{listing_id}"
+    return (
+        f"<Listing>{el('ListingID', listing_id)}"
+        f"{el('Title', f'{tipologia.upper()} COM {bedrooms} QUARTOS NO {neighborhood.upper()}')}"
+        f"{el('DetailViewUrl', f'https://www.jardins.imb.br/imovel/{slug}/')}"
+        f"<Details>{''.join(details)}</Details><Location>{''.join(location)}</Location></Listing>\n"
+    )
+
+# ==============================================================================
+# 2. GERAÇÃO DO FEED
+# ==============================================================================
+
+def generate_feed(path: str, listings: int, seed: int = 42) -> int:
+    """
+    Grava um feed VRSync sintético com 'listings' imóveis, um <Listing> por vez
+    (o uso de memória não depende do tamanho do feed). A mesma 'seed' gera o mesmo arquivo.
+    Retorna o tamanho do arquivo em bytes.
+    """
+    rng = random.Random(seed)
+    header = (f'<?xml version="1.0" encoding="UTF-8"?>\n<ListingDataFeed xmlns="{VRSYNC_NS}">'
+              "<Header><Provider>bench</Provider></Header><Listings>\n")
+    footer = "</Listings></ListingDataFeed>\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header)
+        for index in range(listings):
+            f.write(_listing_xml(index, rng))
+        f.write(footer)
+        size = f.tell()
+    return size
+
+# ==============================================================================
+# 3. EXECUÇÃO DIRETA
+# ==============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um feed VRSync sintético.")
+    parser.add_argument("output", help="Arquivo XML de saída.")
+    parser.add_argument("--listings", type=int, default=1000, help="Quantidade de imóveis (ex.: 100 a 100000).")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    total = generate_feed(args.output, args.listings, args.seed)
+    print(f'Arquivo "{args.output}" gerado com {args.listings} imóveis ({total} bytes).')
@@ -0,0 +1,180 @@
+# backend/bench/mock_ghl.py
+
+import json
+import time
+import random
+import argparse
+import itertools
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from backend.services.metrics import route_for
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+class MockConfig:
+    """
+    Comportamento do servidor falso.
+    - latency/jitter: atraso (s) de cada resposta, somado a um valor aleatório em [0, jitter];
+    - error_rate: fração das requisições respondidas com 500;
+    - rate_limit_rate: fração das requisições respondidas com 429 (com Retry-After);
+    - locations: quantidade de localizações devolvidas por /oauth/installedLocations.
+    """
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.01, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.2, locations: int = 50):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.locations = locations
+
+# ==============================================================================
+# 2. SERVIDOR
+# ==============================================================================
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockGHLServer"
+
+    def log_message(self, *_args):
+        pass
+
+    def _send(self, status: int, body: dict, headers: Optional[dict] = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = urlparse(self.path).path
+        state = self.server
+
+        state.count(method, path)
+        config = state.config
+        time.sleep(config.latency + (random.uniform(0, config.jitter) if config.jitter else 0.0))
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            return self._send(429, {"message": "Too Many Requests"}, {"Retry-After": f"{config.retry_after:g}"})
+        if roll < config.rate_limit_rate + config.error_rate:
+            return self._send(500, {"message": "Internal Server Error"})
+
+        if method == "POST" and path == "/oauth/token":
+            return self._send(200, {"access_token": "agency-token", "refresh_token": "agency-refresh",
+                                    "expires_in": 86399, "userType": "Company"})
+        if method == "GET" and path == "/oauth/installedLocations":
+            locations = [{"_id": f"loc{i:05d}", "name": f"Location {i}"} for i in range(config.locations)]
+            return self._send(200, {"locations": locations})
+        if method == "POST" and path == "/oauth/locationToken":
+            location_id = (parse_qs(body.decode("utf-8")).get("locationId") or [""])[0]
+            return self._send(200, {"access_token": f"token-{location_id}", "expires_in": 86399,
+                                    "locationId": location_id})
+
+        parts = path.strip("/").split("/")
+        if len(parts) >= 3 and parts[0] == "locations" and parts[2] == "customValues":
+            return self._custom_values(method, parts[1], parts[3] if len(parts) > 3 else None, body)
+        self._send(404, {"message": "Not Found"})
+
+    def _custom_values(self, method: str, location_id: str, value_id: Optional[str], body: bytes) -> None:
+        values = self.server.values_for(location_id)
+        if method == "GET" and value_id is None:
+            return self._send(200, {"customValues": [{"id": key, **value} for key, value in values.items()]})
+        if method == "POST" and value_id is None:
+            data = json.loads(body or b"{}")
+            new_id = self.server.next_id()
+            values[new_id] = data
+            return self._send(200, {"customValue": {"id": new_id, **data}})
+        if method == "PUT" and value_id is not None:
+            if value_id not in values:
+                return self._send(404, {"message": "Custom value not found"})
+            values[value_id] = json.loads(body or b"{}")
+            return self._send(200, {"customValue": {"id": value_id}})
+        self._send(404, {"message": "Not Found"})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+class MockGHLServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que imita os endpoints do GHL usados pelo projeto:
+    /oauth/token, /oauth/installedLocations, /oauth/locationToken e
+    /locations/{id}/customValues[/{valueId}]. Os Valores Personalizados ficam em memória.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+        self.requests: Dict[str, int] = {}
+        self._values: Dict[str, Dict[str, dict]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, method: str, path: str) -> None:
+        key = f"{method} {route_for(path)}"
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def values_for(self, location_id: str) -> Dict[str, dict]:
+        with self._lock:
+            return self._values.setdefault(location_id, {})
+
+    def next_id(self) -> str:
+        with self._lock:
+            return f"cv{next(self._ids)}"
+
+    def start(self) -> "MockGHLServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-ghl", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+# ==============================================================================
+# 3. EXECUÇÃO DIRETA
+# ==============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor falso da API do GHL para testes de desempenho.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.02, help="Atraso base (s) de cada resposta.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Atraso aleatório extra máximo (s).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 500.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração de respostas 429.")
+    parser.add_argument("--locations", type=int, default=50, help="Localizações instaladas.")
+    args = parser.parse_args()
+
+    mock = MockGHLServer(MockConfig(args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                                    locations=args.locations), port=args.port)
+    print(f">>> [MOCK] GHL falso em {mock.base_url} (use GHL_API_BASE_URL={mock.base_url}).")
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        pass
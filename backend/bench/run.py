@@ -0,0 +1,237 @@
+# backend/bench/run.py
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import contextlib
+import multiprocessing
+from typing import Callable, Dict, List
+
+from backend.bench.feed_gen import generate_feed
+from backend.bench.mock_ghl import MockConfig, MockGHLServer
+
+# ==============================================================================
+# 1. CENÁRIOS
+# ==============================================================================
+# Cada cenário roda em um processo próprio (pico de RSS isolado), contra o mock do GHL,
+# com todos os arquivos de estado em um diretório temporário. Retorna
+# {"ops", "seconds", "latencies"}; as latências vêm das métricas de services/metrics.py.
+
+def _prepare_tokens(workers: int) -> None:
+    from backend.services import ghl_client
+    if not (ghl_client.refresh_agency_token() and ghl_client.get_installed_locations()
+            and ghl_client.manage_location_tokens(max_workers=workers)):
+        raise RuntimeError("falha ao obter os tokens no mock")
+
+def scenario_tokens(params: dict) -> dict:
+    """Renovação dos tokens de todas as localizações (POST /oauth/locationToken em paralelo)."""
+    from backend.services import ghl_client, metrics, token_store
+    if not (ghl_client.refresh_agency_token() and ghl_client.get_installed_locations()):
+        raise RuntimeError("falha ao obter o token da agência ou a lista de localizações")
+    metrics.reset()
+    started = time.perf_counter()
+    ok = ghl_client.manage_location_tokens(max_workers=params["workers"])
+    seconds = time.perf_counter() - started
+    if not ok:
+        raise RuntimeError("manage_location_tokens falhou")
+    return {
+        "ops": len(token_store.list_locations()),
+        "seconds": seconds,
+        "latencies": metrics.samples("http_request_duration_seconds", route="/oauth/locationToken"),
+    }
+
+def scenario_ingest(params: dict) -> dict:
+    """Pipeline sem publicação (parse -> categorize -> render) sobre o feed sintético, do zero a cada rodada."""
+    from backend.services.pipeline import Pipeline
+    state_file = os.path.join(params["workdir"], "kb_state.json")
+    durations = []
+    for _ in range(params["repeat"]):
+        if os.path.exists(state_file):
+            os.remove(state_file)
+        started = time.perf_counter()
+        result = Pipeline(output_dir=params["workdir"], kb_state_file=state_file).run(params["feed"])
+        durations.append(time.perf_counter() - started)
+        if result is None:
+            raise RuntimeError("o pipeline falhou")
+    return {"ops": params["listings"] * params["repeat"], "seconds": sum(durations), "latencies": durations}
+
+def scenario_publish(params: dict) -> dict:
+    """Publicação das duas bases (geradas do feed sintético) em todas as localizações."""
+    from backend.services import metrics
+    from backend.services.batch_publisher import select_locations, publish_to_locations
+    from backend.services.feed_ingest import iter_listings
+    from backend.services.knowledge_base import categorize_listings, render_knowledge_bases
+
+    _prepare_tokens(params["workers"])
+    base_resumida, base_completa = render_knowledge_bases(categorize_listings(iter_listings(params["feed"])))
+    locations = select_locations()
+    metrics.reset()
+    started = time.perf_counter()
+    results = publish_to_locations(
+        {"jardins_base_completa": base_completa, "jardins_base_resumida": base_resumida},
+        locations, max_workers=params["workers"], per_location_interval=0, force=True,
+    )
+    seconds = time.perf_counter() - started
+    failed = [r for r in results if not r["ok"]]
+    if failed:
+        raise RuntimeError(f"{len(failed)} publicação(ões) falharam")
+    return {
+        "ops": len(results),
+        "seconds": seconds,
+        "latencies": metrics.samples("http_request_duration_seconds"),
+    }
+
+SCENARIOS: Dict[str, Callable[[dict], dict]] = {
+    "tokens": scenario_tokens,
+    "ingest": scenario_ingest,
+    "publish": scenario_publish,
+}
+
+# ==============================================================================
+# 2. EXECUÇÃO ISOLADA
+# ==============================================================================
+
+def _isolate_state(workdir: str) -> None:
+    """
+    Aponta todos os arquivos de estado para 'workdir', sem tocar nos arquivos reais do backend.
+    """
+    from backend.services import ghl_client, sync_state, kb_builder, token_store, snapshot, description_normalizer
+    ghl_client.AGENCY_TOKEN_FILE = os.path.join(workdir, "gohighlevel_token.json")
+    ghl_client.CUSTOM_VALUES_CACHE_FILE = os.path.join(workdir, "custom_values_cache.json")
+    sync_state.SYNC_STATE_FILE = os.path.join(workdir, "sync_state.json")
+    kb_builder.KB_STATE_FILE = os.path.join(workdir, "kb_state.json")
+    snapshot.SNAPSHOT_DIR = os.path.join(workdir, "snapshots")
+    description_normalizer.DESCRIPTION_CACHE_FILE = os.path.join(workdir, "description_cache.json")
+    token_store.LOCATIONS_DB_FILE = os.path.join(workdir, "installed_locations.db")
+    token_store.LEGACY_LOCATIONS_JSON_FILE = os.path.join(workdir, "installed_locations_data.json")
+    with open(ghl_client.AGENCY_TOKEN_FILE, "w", encoding="utf-8") as f:
+        json.dump({"refresh_token": "bench", "userType": "Company", "companyId": "bench"}, f)
+
+def _child(name: str, params: dict, queue, verbose: bool) -> None:
+    try:
+        _isolate_state(params["workdir"])
+        from backend.services.ghl_http import get_http_stats
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            result = SCENARIOS[name](params)
+        http = get_http_stats()
+        result.update({
+            "requests": http["requests"],
+            "retries": http["retries"],
+            # ru_maxrss é informado em KB no Linux (e em bytes no macOS).
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        })
+        queue.put(result)
+    except Exception as e:
+        queue.put({"error": str(e)})
+
+def run_scenario(name: str, params: dict, verbose: bool = False) -> dict:
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-", dir=params["tmpdir"])
+    process = context.Process(target=_child, args=(name, dict(params, workdir=workdir), queue, verbose))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def summarize(name: str, result: dict) -> dict:
+    if "error" in result:
+        return {"scenario": name, "error": result["error"]}
+    latencies = result.pop("latencies")
+    seconds = result["seconds"]
+    return {
+        "scenario": name,
+        **result,
+        "throughput": result["ops"] / seconds if seconds else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+def print_report(rows: List[dict]) -> None:
+    print("\n--- [BENCH] RESULTADOS ---")
+    print(f"    {'cenário':<8} {'ops':>8} {'tempo':>9} {'ops/s':>10} {'p50':>9} {'p99':>9} {'RSS pico':>9} {'req':>7} {'retry':>6}")
+    for row in rows:
+        if "error" in row:
+            print(f"    {row['scenario']:<8} ERRO: {row['error']}")
+            continue
+        print(f"    {row['scenario']:<8} {row['ops']:>8} {row['seconds']:8.2f}s {row['throughput']:10.1f} "
+              f"{row['p50_ms']:7.1f}ms {row['p99_ms']:7.1f}ms {row['peak_rss_mb']:7.1f}MB "
+              f"{row['requests']:>7} {row['retries']:>6}")
+
+# ==============================================================================
+# 3. LÓGICA PRINCIPAL
+# ==============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline do cliente GHL e do pipeline do feed.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Cenários separados por vírgula.")
+    parser.add_argument("--listings", type=int, default=1000, help="Imóveis no feed sintético (100 a 100000).")
+    parser.add_argument("--feed", help="Usa um feed XML existente em vez de gerar um.")
+    parser.add_argument("--locations", type=int, default=50, help="Localizações instaladas no mock.")
+    parser.add_argument("--workers", type=int, default=8, help="Requisições simultâneas.")
+    parser.add_argument("--repeat", type=int, default=3, help="Rodadas do cenário 'ingest'.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Atraso base (s) do mock.")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Atraso aleatório extra máximo (s) do mock.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 500 do mock.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração de respostas 429 do mock.")
+    parser.add_argument("--json", dest="json_path", help="Grava os resultados em JSON (para comparar execuções).")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída das funções durante os cenários.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"!!! [BENCH] Cenário(s) desconhecido(s): {', '.join(unknown)}. Disponíveis: {', '.join(SCENARIOS)}.")
+        sys.exit(2)
+
+    mock = MockGHLServer(MockConfig(args.latency, args.jitter, args.error_rate, args.rate_limit_rate,
+                                    locations=args.locations)).start()
+    with tempfile.TemporaryDirectory(prefix="jardins-bench-") as tmpdir:
+        # Os processos dos cenários herdam o ambiente: API no mock, sem log de métricas em disco.
+        os.environ.update({
+            "GHL_API_BASE_URL": mock.base_url,
+            "AGENCY_COMPANY_ID": "bench",
+            "APP_ID": "bench",
+            "METRICS_LOG_FILE": "",
+            "METRICS_PROM_FILE": "",
+            "FEED_CACHE_DIR": os.path.join(tmpdir, "feed_cache"),
+        })
+
+        feed_path = args.feed
+        if not feed_path:
+            feed_path = os.path.join(tmpdir, "feed.xml")
+            started = time.perf_counter()
+            size = generate_feed(feed_path, args.listings)
+            print(f">>> [BENCH] Feed sintético: {args.listings} imóveis, {size / 1e6:.1f} MB "
+                  f"({time.perf_counter() - started:.2f}s).")
+
+        params = {"feed": feed_path, "listings": args.listings, "workers": args.workers,
+                  "repeat": args.repeat, "tmpdir": tmpdir}
+        rows = []
+        for name in names:
+            print(f">>> [BENCH] Executando '{name}'...")
+            rows.append(summarize(name, run_scenario(name, params, args.verbose)))
+    mock.stop()
+
+    print_report(rows)
+    print(f"    Requisições recebidas pelo mock: {dict(sorted(mock.requests.items()))}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2, ensure_ascii=False)
+        print(f">>> [BENCH] Resultados gravados em '{args.json_path}'.")
+    if any("error" in row for row in rows):
+        sys.exit(1)
@@ -1,89 +1,105 @@
 import time
-import subprocess
 import os
 import sys
+from typing import Optional
 
 # Importa as funções que você já tem
-from backend.services.ghl_client import refresh_agency_token, get_installed_locations, manage_location_tokens, update_single_custom_value, _load_json
+from backend.services.token_manager import ensure_tokens, get_location_access_token, location_token_refresher
+from backend.services import metrics
+from backend.services.ghl_http import print_http_stats
+from backend.services.pipeline import run_pipeline
+from backend.services.batch_publisher import print_summary
+from backend.services.kb_shards import publish_sharded
+from backend.services.sync_state import load_sync_state, save_sync_state, sync_custom_value, new_sync_stats, print_sync_stats
 
 # ==============================================================================
 # CONFIGURAÇÃO (a mesma do seu run_content_update.py)
 # ==============================================================================
 TARGET_LOCATION_ID = "HpZL025bTBTGqi2AvbTf"
-BASE_COMPLETA_PATH = os.path.join(os.path.dirname(__file__), "..", "base_completa.md")
-BASE_RESUMIDA_PATH = os.path.join(os.path.dirname(__file__), "..", "base_resumida.md")
 CUSTOM_VALUE_NAME_COMPLETA = "jardins_base_completa"
 CUSTOM_VALUE_NAME_RESUMIDA = "jardins_base_resumida"
-LOCATIONS_DATA_FILE = os.path.join(os.path.dirname(__file__), "installed_locations_data.json")
 
-# ==============================================================================
-# FUNÇÃO PARA EXECUTAR COMANDOS NODE.JS
-# ==============================================================================
-def run_node_script(script_name):
-    """Executa um script Node.js e verifica por erros."""
-    print(f"\n--- EXECUTANDO SCRIPT NODE.JS: {script_name} ---")
-    try:
-        # Usamos 'node' pois estará no PATH do nosso container Docker
-        process = subprocess.run(["node", script_name], check=True, capture_output=True, text=True)
-        print(process.stdout)
-        print(f">>> SUCESSO: {script_name} concluído.")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"!!! FALHA CRÍTICA ao executar {script_name}:")
-        print(e.stderr)
-        return False
+# Use --force-resync (ou FORCE_RESYNC=1) para reenviar tudo, ignorando o estado local de sincronização.
+FORCE_RESYNC = "--force-resync" in sys.argv or os.getenv("FORCE_RESYNC") == "1"
+# Use --force-token-refresh para renovar todos os tokens mesmo que ainda sejam válidos.
+FORCE_TOKEN_REFRESH = "--force-token-refresh" in sys.argv
+# Use --debug (ou PIPELINE_DEBUG=1) para gravar também os arquivos intermediários (output.json e <categoria>.json).
+DEBUG = "--debug" in sys.argv or os.getenv("PIPELINE_DEBUG") == "1"
+# Use --sharded (ou GHL_SHARDED_PUBLISH=1) para publicar cada base em partes (<nome>_shard_<listingID>, ...) com um <nome>_manifest.
+# Os nomes das partes mudam com o feed: quem lê parte do manifest. A base inteira (<nome>) é esvaziada; veja kb_shards.
+SHARDED = "--sharded" in sys.argv or os.getenv("GHL_SHARDED_PUBLISH") == "1"
 
 # ==============================================================================
-# LÓGICA PRINCIPAL
+# ETAPA DE PUBLICAÇÃO
 # ==============================================================================
-if __name__ == "__main__":
-    print(f"====== INICIANDO PROCESSO COMPLETO DE ATUALIZAÇÃO JARDINS GHL ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
-
-    # ETAPA 1: Gerar os dados mais recentes a partir do XML
-    if not run_node_script("index.js"): sys.exit(1)
-    if not run_node_script("categorize.js"): sys.exit(1)
-    if not run_node_script("generate_knowledge_bases.js"): sys.exit(1)
-    
-    # ETAPA 2: Atualizar todos os tokens do GoHighLevel
-    print("\n--- ATUALIZANDO TOKENS GHL ---")
-    if not refresh_agency_token() or not get_installed_locations() or not manage_location_tokens():
+def publish_to_ghl(conteudo_resumido: str, conteudo_completo: str, sync_state: Optional[dict] = None) -> bool:
+    """
+    Garante tokens válidos e envia as bases para os Valores Personalizados da location alvo.
+    Um 'sync_state' já carregado (ex.: mantido em memória pelo agendador) evita reler o arquivo.
+    """
+    # Tokens do GoHighLevel (renova apenas os que estão expirando)
+    print("\n--- VERIFICANDO TOKENS GHL ---")
+    if not ensure_tokens(force=FORCE_TOKEN_REFRESH):
         print("!!! FALHA CRÍTICA na atualização de tokens GHL. Abortando.")
-        sys.exit(1)
-    print(">>> SUCESSO: Todos os tokens GHL foram atualizados.")
-
-    # ETAPA 3: Ler os arquivos .md gerados
-    print("\n--- LENDO BASES DE CONHECIMENTO GERADAS ---")
-    try:
-        with open(BASE_COMPLETA_PATH, "r", encoding="utf-8") as f:
-            conteudo_completo = f.read()
-        with open(BASE_RESUMIDA_PATH, "r", encoding="utf-8") as f:
-            conteudo_resumido = f.read()
-        print(">>> SUCESSO: Arquivos .md lidos.")
-    except FileNotFoundError as e:
-        print(f"!!! ERRO CRÍTICO: Arquivo .md não encontrado: {e}.")
-        sys.exit(1)
+        return False
+    print(">>> SUCESSO: Todos os tokens GHL estão válidos.")
 
-    # ETAPA 4: Obter o token de acesso específico para a localização alvo
+    # Token de acesso específico para a localização alvo
     print(f"\n--- BUSCANDO TOKEN PARA LOCATION {TARGET_LOCATION_ID} ---")
-    locations_data = _load_json(LOCATIONS_DATA_FILE)
-    access_token = None
-    if locations_data and "locations" in locations_data:
-        for loc in locations_data["locations"]:
-            if loc.get("_id") == TARGET_LOCATION_ID:
-                access_token = loc.get("location_specific_token_data", {}).get("access_token")
-                break
+    access_token = get_location_access_token(TARGET_LOCATION_ID)
     if not access_token:
         print(f"!!! ERRO CRÍTICO: Token para a location alvo não encontrado.")
-        sys.exit(1)
+        return False
     print(">>> SUCESSO: Token da location alvo encontrado.")
 
-    # ETAPA 5: Enviar o conteúdo para o GoHighLevel
+    # Envio do conteúdo para o GoHighLevel
     print("\n--- ENVIANDO CONTEÚDO PARA OS VALORES PERSONALIZADOS GHL ---")
-    sucesso_completa = update_single_custom_value(TARGET_LOCATION_ID, access_token, CUSTOM_VALUE_NAME_COMPLETA, conteudo_completo)
-    sucesso_resumida = update_single_custom_value(TARGET_LOCATION_ID, access_token, CUSTOM_VALUE_NAME_RESUMIDA, conteudo_resumido)
+    if sync_state is None:
+        sync_state = load_sync_state()
+
+    if SHARDED:
+        # Só as partes alteradas são enviadas, em paralelo; o manifest vai por último.
+        started = time.perf_counter()
+        results = publish_sharded(
+            {CUSTOM_VALUE_NAME_COMPLETA: conteudo_completo, CUSTOM_VALUE_NAME_RESUMIDA: conteudo_resumido},
+            [{"id": TARGET_LOCATION_ID, "name": "", "access_token": access_token}],
+            sync_state=sync_state, force=FORCE_RESYNC,
+        )
+        print_summary(results, time.perf_counter() - started)
+        print_http_stats()
+        return all(r["ok"] for r in results)
+
+    sync_stats = new_sync_stats()
+    # Em caso de 401, apenas o token desta localização é renovado e a chamada é repetida.
+    token_refresher = location_token_refresher(TARGET_LOCATION_ID)
+    sucesso_completa = sync_custom_value(sync_state, TARGET_LOCATION_ID, access_token, CUSTOM_VALUE_NAME_COMPLETA, conteudo_completo,
+                                         force=FORCE_RESYNC, stats=sync_stats, token_refresher=token_refresher)
+    sucesso_resumida = sync_custom_value(sync_state, TARGET_LOCATION_ID, access_token, CUSTOM_VALUE_NAME_RESUMIDA, conteudo_resumido,
+                                         force=FORCE_RESYNC, stats=sync_stats, token_refresher=token_refresher)
+    save_sync_state(sync_state)
+    print_sync_stats(sync_stats)
+    print_http_stats()
+    return bool(sucesso_completa and sucesso_resumida)
 
-    if sucesso_completa and sucesso_resumida:
+# ==============================================================================
+# LÓGICA PRINCIPAL
+# ==============================================================================
+if __name__ == "__main__":
+    print(f"====== INICIANDO PROCESSO COMPLETO DE ATUALIZAÇÃO JARDINS GHL ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
+
+    # Pipeline em memória: fetch -> parse -> normalize -> categorize -> snapshot -> render -> publish.
+    # Substitui os scripts index.js, categorize.js e generate_knowledge_bases.js.
+    # Sem imóveis novos, alterados ou removidos, a publicação é pulada (exceto com --force-resync).
+    resultado = run_pipeline(publish=publish_to_ghl, debug=DEBUG, force_publish=FORCE_RESYNC)
+    # Resumo de latência por etapa/rota HTTP e arquivo de métricas no formato Prometheus.
+    metrics.finish_run()
+
+    # Feed inalterado termina com código 0; a execução sem alterações aparece no log e em
+    # pipeline_feed_unchanged_total.
+    if resultado and resultado.get("feed_unchanged"):
+        print(f"\n====== NENHUMA ALTERAÇÃO NO FEED ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
+    elif resultado:
         print(f"\n====== PROCESSO FINALIZADO COM SUCESSO ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
     else:
         print(f"\n====== PROCESSO FINALIZADO COM FALHAS ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,104 @@
+# backend/publish_all.py
+
+import os
+import sys
+import time
+import argparse
+
+from backend.services.batch_publisher import (
+    select_locations, publish_to_locations, print_summary,
+    DEFAULT_PER_LOCATION_CONCURRENCY, DEFAULT_PER_LOCATION_INTERVAL, DEFAULT_RETRIES,
+)
+from backend.services import metrics
+from backend.services.ghl_client import DEFAULT_MAX_WORKERS
+from backend.services.kb_shards import (
+    publish_sharded, SHARD_MAX_BYTES, SHARD_AVG_LINES, SHARD_PER_LOCATION_CONCURRENCY, SHARD_PER_LOCATION_INTERVAL,
+)
+from backend.services.ghl_http import print_http_stats
+from backend.services.token_manager import ensure_tokens
+
+# ==============================================================================
+# CONFIGURAÇÃO
+# ==============================================================================
+BASE_COMPLETA_PATH = os.path.join(os.path.dirname(__file__), "..", "base_completa.md")
+BASE_RESUMIDA_PATH = os.path.join(os.path.dirname(__file__), "..", "base_resumida.md")
+CUSTOM_VALUE_NAME_COMPLETA = "jardins_base_completa"
+CUSTOM_VALUE_NAME_RESUMIDA = "jardins_base_resumida"
+
+# ==============================================================================
+# LÓGICA PRINCIPAL
+# ==============================================================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Publica as bases de conhecimento em todas as localizações instaladas (ou em um subconjunto)."
+    )
+    parser.add_argument("--location", action="append", dest="locations", metavar="ID",
+                        help="ID de uma localização alvo (pode ser repetido). Padrão: todas.")
+    parser.add_argument("--name-contains", help="Filtra as localizações pelo nome.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Tarefas simultâneas no total.")
+    parser.add_argument("--per-location", type=int,
+                        help=f"Tarefas simultâneas por localização (padrão: {DEFAULT_PER_LOCATION_CONCURRENCY}; "
+                             f"{SHARD_PER_LOCATION_CONCURRENCY} com --sharded).")
+    parser.add_argument("--interval", type=float,
+                        help=f"Intervalo mínimo (s) entre requisições na mesma localização (padrão: "
+                             f"{DEFAULT_PER_LOCATION_INTERVAL}; {SHARD_PER_LOCATION_INTERVAL} com --sharded).")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Tentativas extras por tarefa.")
+    parser.add_argument("--force-resync", action="store_true", help="Reenvia mesmo sem alterações no conteúdo.")
+    parser.add_argument("--sharded", action="store_true",
+                        help="Divide cada base em partes de tamanho limitado (<nome>_shard_<listingID>, ...) com um "
+                             "<nome>_manifest, o único nome fixo para quem lê. A base inteira (<nome>) é esvaziada.")
+    parser.add_argument("--shard-max-bytes", type=int, default=SHARD_MAX_BYTES, help="Tamanho máximo de cada parte.")
+    parser.add_argument("--shard-avg-lines", type=int, default=SHARD_AVG_LINES, help="Média de imóveis por parte.")
+    parser.add_argument("--completa", default=BASE_COMPLETA_PATH, help="Caminho da base completa (.md).")
+    parser.add_argument("--resumida", default=BASE_RESUMIDA_PATH, help="Caminho da base resumida (.md).")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"====== INICIANDO PUBLICAÇÃO EM LOTE ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
+
+    try:
+        with open(args.completa, "r", encoding="utf-8") as f:
+            conteudo_completo = f.read()
+        with open(args.resumida, "r", encoding="utf-8") as f:
+            conteudo_resumido = f.read()
+    except FileNotFoundError as e:
+        print(f"!!! ERRO CRÍTICO: Arquivo .md não encontrado: {e}.")
+        sys.exit(1)
+
+    # Renova só os tokens expirados ou ausentes; localizações que continuarem sem token
+    # válido ficam de fora da seleção.
+    print("\n--- VERIFICANDO TOKENS GHL ---")
+    if not ensure_tokens():
+        print("!!! [TOKENS] Nem todos os tokens puderam ser renovados; localizações sem token válido serão ignoradas.")
+
+    locations = select_locations(args.locations, args.name_contains)
+    if not locations:
+        print("!!! ERRO CRÍTICO: Nenhuma localização com token válido foi selecionada.")
+        sys.exit(1)
+    print(f">>> {len(locations)} localização(ões) selecionada(s).")
+
+    started = time.perf_counter()
+    bases = {CUSTOM_VALUE_NAME_COMPLETA: conteudo_completo, CUSTOM_VALUE_NAME_RESUMIDA: conteudo_resumido}
+    options = dict(
+        max_workers=args.workers,
+        retries=args.retries,
+        force=args.force_resync,
+    )
+    # Sem --per-location/--interval, vale o padrão de cada modo (valores avulsos ou partes).
+    if args.per_location is not None:
+        options["per_location_concurrency"] = args.per_location
+    if args.interval is not None:
+        options["per_location_interval"] = args.interval
+    if args.sharded:
+        results = publish_sharded(bases, locations, max_bytes=args.shard_max_bytes,
+                                  avg_lines=args.shard_avg_lines, **options)
+    else:
+        results = publish_to_locations(bases, locations, **options)
+    print_summary(results, time.perf_counter() - started)
+    print_http_stats()
+    metrics.finish_run()
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
@@ -3,7 +3,10 @@
 import os
 import sys
 import json
-from services.ghl_client import update_single_custom_value, _load_json
+from services import metrics
+from services.ghl_http import print_http_stats
+from services.token_manager import get_location_access_token, location_token_refresher
+from services.sync_state import load_sync_state, save_sync_state, sync_custom_value, new_sync_stats, print_sync_stats
 
 # ==============================================================================
 # CONFIGURAÇÃO
@@ -23,8 +26,10 @@ BASE_RESUMIDA_PATH = os.path.join(os.path.dirname(__file__), "..", "base_resumid
 CUSTOM_VALUE_NAME_COMPLETA = "jardins_base_completa"
 CUSTOM_VALUE_NAME_RESUMIDA = "jardins_base_resumida"
 
-# --- Caminho para os dados dos tokens ---
-LOCATIONS_DATA_FILE = os.path.join(os.path.dirname(__file__), "installed_locations_data.json")
+# --- Ressincronização forçada ---
+# Por padrão, valores cujo conteúdo não mudou desde o último envio são pulados.
+# Use --force-resync (ou FORCE_RESYNC=1) para reenviar tudo.
+FORCE_RESYNC = "--force-resync" in sys.argv or os.getenv("FORCE_RESYNC") == "1"
 
 # ==============================================================================
 # LÓGICA PRINCIPAL
@@ -48,16 +53,10 @@ if __name__ == "__main__":
 
     # 2. Encontrar o token de acesso para a localização alvo
     print(f"\nBuscando token de acesso para a Location ID: {TARGET_LOCATION_ID}...")
-    locations_data = _load_json(LOCATIONS_DATA_FILE)
-    access_token = None
-
-    if locations_data and "locations" in locations_data:
-        for loc in locations_data["locations"]:
-            if loc.get("_id") == TARGET_LOCATION_ID or loc.get("id") == TARGET_LOCATION_ID:
-                token_data = loc.get("location_specific_token_data", {})
-                access_token = token_data.get("access_token")
-                break
-    
+    # Reaproveita o token salvo enquanto ele for válido; se estiver expirando,
+    # renova somente o token desta localização.
+    access_token = get_location_access_token(TARGET_LOCATION_ID)
+
     if not access_token:
         print(f"!!! ERRO CRÍTICO: Não foi possível encontrar um access_token para a Location ID '{TARGET_LOCATION_ID}'.")
         print("    Certifique-se de que o script 'update_all_tokens.py' foi executado com sucesso e que esta localização instalou o app.")
@@ -65,21 +64,39 @@ if __name__ == "__main__":
     
     print("-> Token de acesso encontrado com sucesso!")
 
-    # 3. Chamar a função de atualização para cada arquivo
-    sucesso_completa = update_single_custom_value(
+    # 3. Chamar a função de sincronização para cada arquivo (pula o que não mudou)
+    sync_state = load_sync_state()
+    sync_stats = new_sync_stats()
+    token_refresher = location_token_refresher(TARGET_LOCATION_ID)
+
+    sucesso_completa = sync_custom_value(
+        sync_state,
         location_id=TARGET_LOCATION_ID,
         access_token=access_token,
         custom_value_name=CUSTOM_VALUE_NAME_COMPLETA,
-        new_content=conteudo_completo
+        new_content=conteudo_completo,
+        force=FORCE_RESYNC,
+        stats=sync_stats,
+        token_refresher=token_refresher
     )
 
-    sucesso_resumida = update_single_custom_value(
+    sucesso_resumida = sync_custom_value(
+        sync_state,
         location_id=TARGET_LOCATION_ID,
         access_token=access_token,
         custom_value_name=CUSTOM_VALUE_NAME_RESUMIDA,
-        new_content=conteudo_resumido
+        new_content=conteudo_resumido,
+        force=FORCE_RESYNC,
+        stats=sync_stats,
+        token_refresher=token_refresher
     )
 
+    save_sync_state(sync_state)
+    print_sync_stats(sync_stats)
+    print_http_stats()
+    # Resumo de latência por rota HTTP e arquivo de métricas no formato Prometheus.
+    metrics.finish_run()
+
     # 4. Finalizar
     if sucesso_completa and sucesso_resumida:
         print("\n=== Script concluído com SUCESSO! Ambos os valores personalizados foram atualizados. ===")
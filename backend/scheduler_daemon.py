@@ -0,0 +1,132 @@
+# backend/scheduler_daemon.py
+
+import os
+import time
+import argparse
+import threading
+from typing import Optional, Tuple
+
+from backend.main_runner import publish_to_ghl
+from backend.services import metrics
+from backend.services.token_manager import ensure_tokens
+from backend.services.pipeline import run_pipeline, ROOT_DIR, BASE_COMPLETA_FILENAME, BASE_RESUMIDA_FILENAME
+from backend.services.scheduler import PeriodicJob, Scheduler
+from backend.services.sync_state import load_sync_state
+
+# ==============================================================================
+# CONFIGURAÇÃO
+# ==============================================================================
+# Intervalos e jitter (segundos) de cada tarefa. Podem ser sobrescritos pela linha de comando.
+FEED_INTERVAL = float(os.getenv("SCHEDULER_FEED_INTERVAL", "300"))
+FEED_JITTER = float(os.getenv("SCHEDULER_FEED_JITTER", "30"))
+TOKENS_INTERVAL = float(os.getenv("SCHEDULER_TOKENS_INTERVAL", "1800"))
+TOKENS_JITTER = float(os.getenv("SCHEDULER_TOKENS_JITTER", "120"))
+PUBLISH_INTERVAL = float(os.getenv("SCHEDULER_PUBLISH_INTERVAL", "60"))
+PUBLISH_JITTER = float(os.getenv("SCHEDULER_PUBLISH_JITTER", "10"))
+# Tempo máximo (segundos) para as tarefas em andamento terminarem após o SIGTERM.
+# O 'docker stop' espera 10s por padrão; use 'docker stop -t' para um prazo maior.
+SHUTDOWN_TIMEOUT = float(os.getenv("SCHEDULER_SHUTDOWN_TIMEOUT", "120"))
+# Porta do endpoint GET /metrics (formato Prometheus). 0 desativa; o arquivo METRICS_PROM_FILE é sempre gravado.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# ==============================================================================
+# ESTADO EM MEMÓRIA
+# ==============================================================================
+class DaemonState:
+    """
+    Estado mantido entre as execuções das tarefas: as últimas bases geradas pelo feed
+    e o estado de sincronização dos Valores Personalizados (carregado uma única vez).
+    Conexões HTTP (ghl_http.get_session) e o banco de tokens (token_store) já são
+    reaproveitados pelo próprio processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bases: Optional[Tuple[str, str]] = None
+        self.sync_state = load_sync_state()
+
+    def set_bases(self, base_resumida: str, base_completa: str) -> None:
+        with self._lock:
+            self._bases = (base_resumida, base_completa)
+
+    def get_bases(self) -> Optional[Tuple[str, str]]:
+        """
+        Últimas bases geradas. Antes da primeira geração com mudanças, usa as bases .md
+        gravadas em disco pela execução anterior.
+        """
+        with self._lock:
+            if self._bases is None:
+                try:
+                    with open(os.path.join(ROOT_DIR, BASE_RESUMIDA_FILENAME), "r", encoding="utf-8") as f:
+                        base_resumida = f.read()
+                    with open(os.path.join(ROOT_DIR, BASE_COMPLETA_FILENAME), "r", encoding="utf-8") as f:
+                        base_completa = f.read()
+                except FileNotFoundError:
+                    return None
+                self._bases = (base_resumida, base_completa)
+            return self._bases
+
+# ==============================================================================
+# TAREFAS
+# ==============================================================================
+def make_jobs(state: DaemonState, args) -> list:
+    def poll_feed() -> bool:
+        # Sem etapa de publicação: as bases ficam em memória para a tarefa 'publish'.
+        resultado = run_pipeline(debug=args.debug)
+        if resultado is None:
+            return False
+        if not resultado.get("feed_unchanged"):
+            state.set_bases(resultado["base_resumida"], resultado["base_completa"])
+        return True
+
+    def refresh_tokens() -> bool:
+        return ensure_tokens()
+
+    def publish() -> bool:
+        bases = state.get_bases()
+        if bases is None:
+            print("--- [SCHEDULER] Nenhuma base gerada ainda. Publicação adiada.")
+            return True
+        # O estado de sincronização em memória faz com que bases inalteradas não gerem
+        # nenhuma chamada de rede.
+        return publish_to_ghl(*bases, sync_state=state.sync_state)
+
+    return [
+        PeriodicJob("tokens", refresh_tokens, args.tokens_interval, args.tokens_jitter),
+        PeriodicJob("feed", poll_feed, args.feed_interval, args.feed_jitter),
+        PeriodicJob("publish", publish, args.publish_interval, args.publish_jitter),
+    ]
+
+# ==============================================================================
+# LÓGICA PRINCIPAL
+# ==============================================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Executa, em um processo residente, a leitura do feed, a renovação de tokens e a publicação."
+    )
+    parser.add_argument("--feed-interval", type=float, default=FEED_INTERVAL, help="Intervalo (s) da leitura do feed.")
+    parser.add_argument("--feed-jitter", type=float, default=FEED_JITTER, help="Jitter máximo (s) da leitura do feed.")
+    parser.add_argument("--tokens-interval", type=float, default=TOKENS_INTERVAL, help="Intervalo (s) da renovação de tokens.")
+    parser.add_argument("--tokens-jitter", type=float, default=TOKENS_JITTER, help="Jitter máximo (s) da renovação de tokens.")
+    parser.add_argument("--publish-interval", type=float, default=PUBLISH_INTERVAL, help="Intervalo (s) da publicação.")
+    parser.add_argument("--publish-jitter", type=float, default=PUBLISH_JITTER, help="Jitter máximo (s) da publicação.")
+    parser.add_argument("--shutdown-timeout", type=float, default=SHUTDOWN_TIMEOUT,
+                        help="Espera máxima (s) pelas tarefas em andamento ao encerrar.")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Porta do endpoint /metrics (0 desativa).")
+    parser.add_argument("--debug", action="store_true", help="Grava também os arquivos intermediários do pipeline.")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    print(f"====== INICIANDO AGENDADOR JARDINS GHL ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
+
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+
+    scheduler = Scheduler(make_jobs(DaemonState(), args), shutdown_timeout=args.shutdown_timeout)
+    scheduler.install_signal_handlers()
+    scheduler.run()
+    metrics.finish_run()
+
+    print(f"\n====== AGENDADOR ENCERRADO ({time.strftime('%Y-%m-%d %H:%M:%S')}) ======")
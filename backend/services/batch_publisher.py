@@ -0,0 +1,174 @@
+# backend/services/batch_publisher.py
+
+import time
+import threading
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from . import token_store
+from .ghl_client import DEFAULT_MAX_WORKERS
+from .sync_state import load_sync_state, save_sync_state, sync_custom_value, is_synced, new_sync_stats, print_sync_stats
+from .token_manager import location_token_refresher, token_is_valid
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Quantas atualizações simultâneas são permitidas na mesma localização.
+DEFAULT_PER_LOCATION_CONCURRENCY = 1
+# Intervalo mínimo (segundos) entre o início de duas requisições na mesma localização.
+DEFAULT_PER_LOCATION_INTERVAL = 0.5
+# Tentativas extras em caso de falha transitória (429, 5xx, falha de rede), com espera
+# exponencial a partir de RETRY_BACKOFF segundos. Erros permanentes (400/401/403) não são repetidos.
+DEFAULT_RETRIES = 2
+RETRY_BACKOFF = 1.0
+
+# ==============================================================================
+# 2. SELEÇÃO DE LOCALIZAÇÕES
+# ==============================================================================
+
+def select_locations(location_ids: Optional[Iterable[str]] = None, name_contains: Optional[str] = None) -> List[dict]:
+    """
+    Lê as localizações salvas uma única vez e retorna [{id, name, access_token}]
+    para as localizações com token válido (veja token_is_valid), opcionalmente filtradas
+    por ID ou por trecho do nome (sem diferenciar maiúsculas/minúsculas).
+    Não renova nada: chame token_manager.ensure_tokens() antes para renovar os expirados.
+    """
+    if location_ids:
+        # Busca indexada por ID, sem carregar todas as localizações.
+        candidates = [loc for loc in map(token_store.get_location, location_ids) if loc]
+    else:
+        candidates = token_store.list_locations()
+    if not candidates:
+        print(f"!!! [BATCH] ERRO: Nenhuma localização encontrada em '{token_store.LOCATIONS_DB_FILE}'.")
+        return []
+
+    selected = []
+    for loc in candidates:
+        location_id = loc.get("_id") or loc.get("id")
+        if not location_id:
+            continue
+        if name_contains and name_contains.lower() not in (loc.get("name") or "").lower():
+            continue
+        token_data = loc.get("location_specific_token_data") or {}
+        if not token_is_valid(token_data):
+            print(f"    !!! [BATCH] Location {location_id} sem token válido (ausente ou expirado). Ignorada.")
+            continue
+        selected.append({"id": location_id, "name": loc.get("name") or "", "access_token": token_data["access_token"]})
+    return selected
+
+# ==============================================================================
+# 3. PUBLICAÇÃO EM LOTE
+# ==============================================================================
+
+class _LocationLimiter:
+    """
+    Limita a concorrência e o ritmo de requisições para uma mesma localização.
+    """
+
+    def __init__(self, concurrency: int, min_interval: float):
+        self._semaphore = threading.Semaphore(max(1, concurrency))
+        self._lock = threading.Lock()
+        self._min_interval = min_interval
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._min_interval
+        if wait > 0:
+            time.sleep(wait)
+        return self
+
+    def __exit__(self, *exc):
+        self._semaphore.release()
+        return False
+
+def publish_to_locations(contents: Dict[str, str], locations: List[dict], max_workers: Optional[int] = None,
+                         per_location_concurrency: int = DEFAULT_PER_LOCATION_CONCURRENCY,
+                         per_location_interval: float = DEFAULT_PER_LOCATION_INTERVAL,
+                         retries: int = DEFAULT_RETRIES, force: bool = False,
+                         location_contents: Optional[Callable[[dict], Dict[str, str]]] = None,
+                         sync_state: Optional[dict] = None) -> List[dict]:
+    """
+    Agenda todas as combinações (localização, valor personalizado) em paralelo.
+    'contents' mapeia o nome do Valor Personalizado para o conteúdo a ser enviado;
+    'location_contents', se informado, devolve valores extras específicos de cada localização.
+    Tarefas com conteúdo já sincronizado são resolvidas na hora, sem entrar na fila nem
+    esperar pelo limitador da localização; as demais são repetidas apenas em falhas transitórias.
+    Retorna uma lista de resultados, um por tarefa.
+    Um 'sync_state' já carregado é usado (e atualizado) no lugar do arquivo.
+    """
+    if sync_state is None:
+        sync_state = load_sync_state()
+    limiters = {loc["id"]: _LocationLimiter(per_location_concurrency, per_location_interval) for loc in locations}
+    # Um callback por localização: um 401 renova apenas o token daquela localização.
+    refreshers = {loc["id"]: location_token_refresher(loc["id"]) for loc in locations}
+
+    def run_task(loc: dict, custom_value_name: str, content: str) -> dict:
+        started = time.perf_counter()
+        stats = new_sync_stats()
+        # Conteúdo já sincronizado não gera requisição: não ocupa o limitador da localização.
+        unchanged = not force and is_synced(sync_state, loc["id"], custom_value_name, content)
+        limiter = contextlib.nullcontext() if unchanged else limiters[loc["id"]]
+        attempts = 0
+        for attempt in range(retries + 1):
+            attempts = attempt + 1
+            with limiter:
+                # O estado é um dict compartilhado; cada tarefa escreve em uma chave própria.
+                result = sync_custom_value(sync_state, loc["id"], loc["access_token"], custom_value_name, content,
+                                           force=force, stats=stats, token_refresher=refreshers[loc["id"]])
+            if result.ok or not result.transient:
+                break
+            if attempt < retries:
+                time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        ok = result.ok
+        # Falhas intermediárias não contam no resumo; só o resultado final da tarefa.
+        stats["failed"] = 0 if ok else 1
+        return {
+            "location_id": loc["id"],
+            "location_name": loc["name"],
+            "custom_value_name": custom_value_name,
+            "ok": ok,
+            "skipped": stats["skipped"] > 0,
+            "attempts": attempts,
+            "elapsed": time.perf_counter() - started,
+            "stats": stats,
+        }
+
+    tasks = []
+    for loc in locations:
+        loc_contents = dict(contents, **location_contents(loc)) if location_contents else contents
+        tasks.extend((loc, name, content) for name, content in loc_contents.items())
+    workers = max(1, max_workers or DEFAULT_MAX_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = [
+            run_task(*task) if not force and is_synced(sync_state, task[0]["id"], task[1], task[2])
+            else executor.submit(run_task, *task)
+            for task in tasks
+        ]
+        results = [item.result() if isinstance(item, Future) else item for item in pending]
+
+    save_sync_state(sync_state)
+    return results
+
+def print_summary(results: List[dict], elapsed: float) -> None:
+    """
+    Imprime uma tabela com o resultado de cada tarefa e os totais da execução.
+    """
+    print("\n=== RESUMO DA PUBLICAÇÃO EM LOTE ===")
+    print(f"{'LOCATION':<24} {'VALOR PERSONALIZADO':<28} {'STATUS':<8} {'TENT.':>5} {'TEMPO':>8}")
+    for r in results:
+        status = "PULADO" if r["skipped"] else ("OK" if r["ok"] else "FALHA")
+        print(f"{r['location_id']:<24} {r['custom_value_name']:<28} {status:<8} {r['attempts']:>5} {r['elapsed']:>7.2f}s")
+
+    totals = new_sync_stats()
+    for r in results:
+        for key in totals:
+            totals[key] += r["stats"][key]
+    succeeded = sum(1 for r in results if r["ok"])
+    print(f"\n>>> [BATCH] {succeeded}/{len(results)} tarefa(s) com sucesso em {elapsed:.2f}s.")
+    print_sync_stats(totals)
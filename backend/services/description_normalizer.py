@@ -0,0 +1,199 @@
+# backend/services/description_normalizer.py
+
+import os
+import re
+import html
+import hashlib
+from typing import Dict, List, Optional, Set
+
+from .ghl_client import _load_json, _save_json
+from .listing_index import normalize_key
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Resultados da limpeza por hash da descrição: só descrições novas ou editadas são processadas.
+DESCRIPTION_CACHE_FILE = os.path.join(os.path.dirname(__file__), "..", "description_cache.json")
+# Versão de clean_description. Incremente ao mudar a limpeza: um cache gravado por outra
+# versão é descartado e todas as descrições são processadas de novo.
+NORMALIZER_VERSION = 2
+
+# Quebras de linha em HTML que viram "\n" antes de remover as demais tags.
+_LINE_BREAK_TAGS = re.compile(r"<\s*(br|/p|p|/li|li|/div|div|/h[1-6])\b[^>]*>", re.IGNORECASE)
+_TAGS = re.compile(r"<[^>]+>")
+_SPACES = re.compile(r"[ \t\u00a0]+")
+# Cabeçalho da lista de características, como no feed: "<strong>Características:</strong>".
+_FEATURES_HEADER = re.compile(r"^caracter[ií]sticas\s*:?$", re.IGNORECASE)
+_BULLET = re.compile(r"^[•·\-\*▪◦●]\s*")
+
+# Vocabulário do feed: 'features' vêm em inglês (<Feature>) e a lista de "Características"
+# da descrição em português. Cada grupo reúne os termos equivalentes; a comparação usa
+# normalize_key (sem acentos nem maiúsculas).
+FEATURE_ALIASES = {
+    "BBQ": ("Churrasqueira",),
+    "Barbecue Balcony": ("Sacada com churrasqueira",),
+    "Parking Garage": ("Garagem", "Vaga de garagem", "Vagas de garagem"),
+    "Living Room": ("Sala de estar", "Living", "Sala"),
+    "Maid's Quarters": ("Área de serviço", "Dependência de empregada"),
+    "Dining Room": ("Sala de jantar",),
+    "Kitchen": ("Cozinha", "Copa/cozinha"),
+    "Party Room": ("Salão de festas",),
+    "Gourmet Area": ("Espaço gourmet", "Área gourmet"),
+    "Fitness Room": ("Espaço fitness", "Academia"),
+    "Elevator": ("Elevador",),
+    "Playground": ("Playground",),
+    "Balcony": ("Sacada / Varanda", "Sacada", "Varanda"),
+    "Bicycles Place": ("Bicicletário",),
+    "Game room": ("Sala de jogos",),
+    "TV Security": ("Câmeras de segurança", "CFTV"),
+    "Closet": ("Closet",),
+    "Pool": ("Piscina", "Piscina privativa"),
+    "Home Office": ("Home office", "Escritório"),
+    "Integrated Environments": ("Ambientes integrados", "Sacada integrada"),
+    "Cooling": ("Ar condicionado",),
+    "Sports Court": ("Quadra esportiva", "Quadra poliesportiva"),
+    "Garden Area": ("Jardim",),
+    "Doorman": ("Portaria 24h", "Portaria 24 horas", "Porteiro"),
+    "Controlled Access": ("Portaria 24h", "Portaria 24 horas", "Acesso controlado"),
+    "Pets Allowed": ("Aceita pet", "Aceita pets"),
+    "Jacuzzi/Hot Tub": ("Hidromassagem", "Jacuzzi"),
+    "Media Room": ("Cinema", "Sala de cinema"),
+    "Alarm System": ("Sistema de alarme",),
+    "Hard Wood Floor": ("Piso de madeira",),
+    "Sauna": ("Sauna",),
+    "Warehouse": ("Despensa", "Depósito"),
+    "Generator": ("Gerador",),
+    "Fireplace": ("Lareira",),
+    "Ocean View": ("Vista mar", "Vista para o mar"),
+    "Laundry": ("Lavanderia", "Lavanderia coletiva"),
+    "Bar": ("Bar",),
+    "Ceramic Tile": ("Piso cerâmico",),
+}
+
+# ==============================================================================
+# 2. LIMPEZA
+# ==============================================================================
+
+def description_hash(description: str) -> str:
+    return hashlib.sha1(description.encode("utf-8")).hexdigest()
+
+def clean_description(description: Optional[str]) -> Dict[str, object]:
+    """
+    Remove as tags, decodifica as entidades (&nbsp;, &amp;, ...) e separa a lista de
+    "Características" em itens. Retorna {"text": texto limpo, "bullets": [itens]}.
+    """
+    if not description:
+        return {"text": "", "bullets": []}
+
+    # As entidades são decodificadas depois das tags, para que "&lt;b&gt;" escrito
+    # como texto não vire uma tag removida.
+    text = _TAGS.sub("", _LINE_BREAK_TAGS.sub("\n", description))
+    text = html.unescape(text)
+
+    lines: List[str] = []
+    bullets: List[str] = []
+    in_features = False
+    for raw_line in text.splitlines():
+        line = _SPACES.sub(" ", raw_line).strip()
+        if not line:
+            continue
+        if _FEATURES_HEADER.match(line):
+            in_features = True
+            continue
+        bullet = _BULLET.match(line)
+        # Só a lista depois do cabeçalho vira itens; marcadores no texto livre ficam no texto.
+        if bullet and in_features:
+            item = line[bullet.end():].strip()
+            if item:
+                bullets.append(item)
+            continue
+        in_features = False
+        lines.append(line)
+
+    return {"text": "\n".join(lines), "bullets": bullets}
+
+def _feature_key(text: Optional[str]) -> str:
+    return normalize_key(text).rstrip(" .;:")
+
+def _build_equivalents(aliases: Dict[str, tuple]) -> Dict[str, Set[str]]:
+    """
+    Chave normalizada -> todas as chaves equivalentes (a própria e as dos grupos em que aparece).
+    """
+    equivalents: Dict[str, Set[str]] = {}
+    for feature, terms in aliases.items():
+        group = {_feature_key(term) for term in (feature, *terms)}
+        for key in group:
+            equivalents.setdefault(key, set()).update(group)
+    return equivalents
+
+_EQUIVALENTS = _build_equivalents(FEATURE_ALIASES)
+
+def dedupe_features(bullets: List[str], features: Optional[List[str]]) -> List[str]:
+    """
+    Itens da descrição que ainda não estão em 'features', sem repetições e na ordem
+    original. Termos equivalentes em FEATURE_ALIASES ("BBQ" e "Churrasqueira") contam
+    como o mesmo item; acentos, maiúsculas e pontuação final são ignorados.
+    """
+    seen: Set[str] = set()
+    for feature in features or []:
+        key = _feature_key(feature)
+        seen.update(_EQUIVALENTS.get(key, {key}))
+    extra = []
+    for item in bullets:
+        key = _feature_key(item)
+        if key and key not in seen:
+            seen.update(_EQUIVALENTS.get(key, {key}))
+            extra.append(item)
+    return extra
+
+# ==============================================================================
+# 3. NORMALIZAÇÃO COM MEMOIZAÇÃO
+# ==============================================================================
+
+class DescriptionNormalizer:
+    """
+    Acrescenta a cada registro 'descriptionText' (texto limpo) e 'descriptionFeatures'
+    (características da descrição que não estão em 'features'). A descrição original
+    é preservada. A limpeza é memoizada pelo hash da descrição e persistida em
+    DESCRIPTION_CACHE_FILE por save(), junto com NORMALIZER_VERSION; entradas que não
+    aparecem mais no feed são descartadas.
+    """
+
+    def __init__(self, cache_file: Optional[str] = None):
+        self.cache_file = cache_file or DESCRIPTION_CACHE_FILE
+        data = _load_json(self.cache_file) or {}
+        if data.get("version") == NORMALIZER_VERSION:
+            self._cache: Dict[str, dict] = data.get("entries") or {}
+        else:
+            if data:
+                print(">>> [PIPELINE] Cache de descrições gravado por outra versão da limpeza. Descartado.")
+            self._cache = {}
+        self._used: Dict[str, dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, record: dict) -> dict:
+        description = record.get("description") or ""
+        key = description_hash(description)
+        cleaned = self._used.get(key) or self._cache.get(key)
+        if cleaned is None:
+            cleaned = clean_description(description)
+            self.misses += 1
+        else:
+            self.hits += 1
+        self._used[key] = cleaned
+
+        record["descriptionText"] = cleaned["text"]
+        record["descriptionFeatures"] = dedupe_features(cleaned["bullets"], record.get("features"))
+        return record
+
+    def normalize_all(self, records: List[dict]) -> List[dict]:
+        for record in records:
+            self.normalize(record)
+        return records
+
+    def save(self) -> None:
+        if self._used != self._cache:
+            _save_json(self.cache_file, {"version": NORMALIZER_VERSION, "entries": self._used})
+            self._cache = dict(self._used)
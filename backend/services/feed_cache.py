@@ -0,0 +1,115 @@
+# backend/services/feed_cache.py
+
+import os
+import time
+import hashlib
+import requests
+from typing import Optional
+
+from . import metrics
+from .ghl_client import _load_json, _save_json
+from .feed_ingest import FEED_URL, FEED_TIMEOUT
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Cópia local do último XML baixado e dos seus validadores (ETag, Last-Modified, SHA-256).
+FEED_CACHE_DIR = os.getenv("FEED_CACHE_DIR", os.path.join(os.path.dirname(__file__), "..", ".feed_cache"))
+FEED_CACHE_FILENAME = "feed.xml"
+FEED_META_FILENAME = "feed_meta.json"
+
+_CHUNK_SIZE = 64 * 1024
+
+# ==============================================================================
+# 2. DOWNLOAD CONDICIONAL
+# ==============================================================================
+
+def _cache_paths():
+    return (
+        os.path.join(FEED_CACHE_DIR, FEED_CACHE_FILENAME),
+        os.path.join(FEED_CACHE_DIR, FEED_META_FILENAME),
+    )
+
+def fetch_feed(url: Optional[str] = None, force: bool = False) -> dict:
+    """
+    Baixa o feed para o cache local somente se ele mudou na origem.
+    - Envia If-None-Match / If-Modified-Since com os validadores salvos (exceto com 'force').
+    - Aceita transferência compactada (gzip/deflate); o cache guarda o XML descompactado.
+    - Se a origem responder 200 mas o conteúdo tiver o mesmo SHA-256 do cache, o feed
+      também é considerado inalterado (servidores sem ETag/Last-Modified).
+    - Um 304 sem cópia local (ex.: o arquivo foi apagado) é repetido sem validadores;
+      o corpo vazio de um 304 nunca é gravado como cache.
+    Retorna {"path", "changed", "status", "bytes", "sha256"}. Erros HTTP são propagados.
+    """
+    url = url or FEED_URL
+    cache_path, meta_path = _cache_paths()
+    os.makedirs(FEED_CACHE_DIR, exist_ok=True)
+
+    meta = _load_json(meta_path) or {}
+    has_cache = os.path.exists(cache_path) and meta.get("url") == url
+
+    headers = {"Accept-Encoding": "gzip, deflate"}
+    if has_cache and not force:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    started = time.perf_counter()
+    with requests.get(url, headers=headers, stream=True, timeout=FEED_TIMEOUT) as resp:
+        if resp.status_code == 304:
+            metrics.record_http("GET", url, 304, time.perf_counter() - started, route="feed")
+            # O arquivo pode ter sido apagado depois da verificação acima.
+            if has_cache and not force and os.path.exists(cache_path):
+                print(">>> [FEED] Origem respondeu 304 Not Modified. Usando o cache local.")
+                meta["checked_at"] = int(time.time())
+                _save_json(meta_path, meta)
+                return {"path": cache_path, "changed": False, "status": 304, "bytes": 0, "sha256": meta.get("sha256")}
+            if force:
+                raise requests.exceptions.HTTPError("Origem respondeu 304 a uma requisição sem validadores.", response=resp)
+            print("!!! [FEED] Origem respondeu 304, mas não há cópia local. Baixando sem validadores.")
+            return fetch_feed(url, force=True)
+
+        if not resp.ok:
+            metrics.record_http("GET", url, resp.status_code, time.perf_counter() - started, route="feed")
+        resp.raise_for_status()
+
+        # Grava em um arquivo temporário enquanto calcula o hash; o cache só é
+        # substituído quando o download termina por completo.
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        resp.raw.decode_content = True
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: resp.raw.read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+
+        # 'size' é o XML descompactado; o tamanho transferido fica em 'wire_bytes'.
+        metrics.record_http("GET", url, resp.status_code, time.perf_counter() - started, response_bytes=size,
+                            route="feed", wire_bytes=resp.raw.tell())
+        sha256 = digest.hexdigest()
+        changed = force or not has_cache or sha256 != meta.get("sha256")
+        if changed:
+            os.replace(tmp_path, cache_path)
+        else:
+            os.remove(tmp_path)
+            print(">>> [FEED] Conteúdo idêntico ao do cache (mesmo SHA-256).")
+
+        now = int(time.time())
+        _save_json(meta_path, {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "size": size,
+            "content_encoding": resp.headers.get("Content-Encoding"),
+            "fetched_at": now if changed else meta.get("fetched_at", now),
+            "checked_at": now,
+        })
+
+    print(f">>> [FEED] Feed baixado ({size} bytes, status {resp.status_code}, "
+          f"{'alterado' if changed else 'inalterado'}).")
+    return {"path": cache_path, "changed": changed, "status": resp.status_code, "bytes": size, "sha256": sha256}
@@ -0,0 +1,180 @@
+# backend/services/feed_ingest.py
+
+import os
+import sys
+import json
+import requests
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional, Union
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# URL do XML remoto (a mesma usada pelo index.js)
+FEED_URL = os.getenv(
+    "FEED_URL",
+    "https://restrito.casteldigital.com.br/vivareal_open/jardins.imb.br-vivareal.xml?auth=jEzonWGJdq",
+)
+FEED_TIMEOUT = int(os.getenv("FEED_TIMEOUT", "60"))
+
+# Namespace definido no XML
+VRSYNC_NS = "http://www.vivareal.com/schemas/1.0/VRSync"
+_LISTING_TAG = f"{{{VRSYNC_NS}}}Listing"
+
+# ==============================================================================
+# 2. FUNÇÕES AUXILIARES
+# ==============================================================================
+
+def _find(node: Optional[ET.Element], tag: str) -> Optional[ET.Element]:
+    """
+    Primeiro descendente com a tag informada (equivalente a getElementsByTagNameNS(NS, tag)[0]).
+    """
+    if node is None:
+        return None
+    return node.find(f".//{{{VRSYNC_NS}}}{tag}")
+
+def _text(node: Optional[ET.Element]) -> Optional[str]:
+    """
+    Texto completo do nó (equivalente a textContent), ou None se vazio.
+    """
+    if node is None:
+        return None
+    return "".join(node.itertext()) or None
+
+def _node_text(node: Optional[ET.Element], tag: str) -> Optional[str]:
+    return _text(_find(node, tag))
+
+def _attr(node: Optional[ET.Element], attribute: str) -> Optional[str]:
+    if node is None:
+        return None
+    return node.get(attribute) or None
+
+def _value_with_attr(details: Optional[ET.Element], tag: str, attribute: str, value_key: str = "value") -> dict:
+    node = _find(details, tag)
+    return {value_key: _text(node), attribute: _attr(node, attribute)}
+
+def listing_to_record(listing: ET.Element) -> dict:
+    """
+    Converte um elemento <Listing> no mesmo formato de registro gerado pelo index.js.
+    """
+    details = _find(listing, "Details")
+    location = _find(listing, "Location")
+
+    admin_fee_node = _find(details, "PropertyAdministrationFee")
+    admin_fee = _text(admin_fee_node)
+
+    features_node = _find(details, "Features")
+    features = []
+    if features_node is not None:
+        features = ["".join(node.itertext()) for node in features_node.iter(f"{{{VRSYNC_NS}}}Feature")]
+
+    return {
+        "listingID": _node_text(listing, "ListingID"),
+        "title": _node_text(listing, "Title"),
+        "detailViewUrl": _node_text(listing, "DetailViewUrl"),
+        "tipologia": _node_text(details, "Tipologia"),
+        "description": _node_text(details, "Description"),
+        "listPrice": _value_with_attr(details, "ListPrice", "currency"),
+        "propertyAdministrationFee": {
+            "value": admin_fee,
+            "currency": _attr(admin_fee_node, "currency"),
+        } if admin_fee else None,
+        "constructedArea": _value_with_attr(details, "ConstructedArea", "unit"),
+        "livingArea": _value_with_attr(details, "LivingArea", "unit"),
+        "lotArea": _value_with_attr(details, "LotArea", "unit"),
+        "bedrooms": _node_text(details, "Bedrooms"),
+        "bathrooms": _node_text(details, "Bathrooms"),
+        "suites": _node_text(details, "Suites"),
+        "garage": _value_with_attr(details, "Garage", "type"),
+        "features": features,
+        "neighborhood": _node_text(location, "Neighborhood"),
+        "address": _node_text(location, "Address"),
+        "streetNumber": _node_text(location, "StreetNumber"),
+        "complement": _node_text(location, "Complement"),
+        "postalCode": _node_text(location, "PostalCode"),
+    }
+
+# ==============================================================================
+# 3. LEITURA EM STREAMING
+# ==============================================================================
+
+def iter_listings_from_stream(stream: IO[bytes]) -> Iterator[dict]:
+    """
+    Lê o XML de forma incremental e gera um registro por <Listing> assim que ele termina.
+    Cada <Listing> processado é removido da árvore, então o uso de memória não cresce
+    com o tamanho do feed.
+    """
+    # Pilha de elementos abertos, para remover cada <Listing> do seu pai após o uso.
+    stack = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if elem.tag == _LISTING_TAG:
+            yield listing_to_record(elem)
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+@contextmanager
+def open_feed(source: Union[str, IO[bytes], None] = None) -> Iterator[IO[bytes]]:
+    """
+    Abre o feed como um fluxo binário a partir de uma URL (padrão: FEED_URL), de um
+    caminho local ou de um arquivo já aberto. Com URL, a resposta é lida em streaming
+    e descompactada (gzip/deflate) de forma transparente.
+    """
+    source = FEED_URL if source is None else source
+
+    if not isinstance(source, str):
+        yield source
+        return
+
+    if source.startswith(("http://", "https://")):
+        with requests.get(source, stream=True, timeout=FEED_TIMEOUT, headers={"Accept-Encoding": "gzip, deflate"}) as resp:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            yield resp.raw
+        return
+
+    with open(source, "rb") as f:
+        yield f
+
+def iter_listings(source: Union[str, IO[bytes], None] = None) -> Iterator[dict]:
+    """
+    Gera os registros do feed a partir de uma URL, de um caminho local ou de um arquivo
+    aberto (veja open_feed). Com URL, os registros ficam disponíveis enquanto o download
+    ainda acontece.
+    """
+    with open_feed(source) as stream:
+        yield from iter_listings_from_stream(stream)
+
+def write_listings_json(listings, path: str) -> int:
+    """
+    Grava os registros no mesmo formato do output.json gerado pelo index.js (o mesmo
+    texto de json.dump(lista, indent=2)). Cada registro é gravado assim que chega,
+    então um gerador (ex.: iter_listings) é consumido sem manter a lista em memória.
+    Retorna a quantidade de registros gravados.
+    """
+    total = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for record in listings:
+            f.write("[\n  " if total == 0 else ",\n  ")
+            f.write(json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+            total += 1
+        f.write("\n]" if total else "[]")
+    return total
+
+# ==============================================================================
+# 4. EXECUÇÃO DIRETA
+# ==============================================================================
+
+if __name__ == "__main__":
+    # Uso: python -m backend.services.feed_ingest [url_ou_arquivo] [saida.json]
+    feed_source = sys.argv[1] if len(sys.argv) > 1 else FEED_URL
+    output_path = sys.argv[2] if len(sys.argv) > 2 else "output.json"
+    total = write_listings_json(iter_listings(feed_source), output_path)
+    print(f'Arquivo "{output_path}" gerado com {total} registros.')
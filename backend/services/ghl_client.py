@@ -3,10 +3,15 @@
 import os
 import json
 import time
+import threading
 import requests
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from . import token_store
+from .ghl_http import ghl_request, NO_RESPONSE_STATUS
+
 # ==============================================================================
 # 1. CONFIGURAÇÃO INICIAL
 # ==============================================================================
@@ -16,7 +21,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- Constantes da API ---
-API_BASE_URL = "https://services.leadconnectorhq.com"
+# GHL_API_BASE_URL permite apontar para outro servidor (ex.: o mock de backend/bench).
+API_BASE_URL = os.getenv("GHL_API_BASE_URL", "https://services.leadconnectorhq.com").rstrip("/")
 API_VERSION = "2021-07-28"
 
 # --- Caminhos dos Arquivos de Dados ---
@@ -24,7 +30,8 @@ API_VERSION = "2021-07-28"
 # os.path.dirname(__file__) se refere ao diretório atual (services)
 # ".." sobe um nível para a pasta 'backend'
 AGENCY_TOKEN_FILE   = os.path.join(os.path.dirname(__file__), "..", "gohighlevel_token.json")
-LOCATIONS_DATA_FILE = os.path.join(os.path.dirname(__file__), "..", "installed_locations_data.json")
+# As localizações instaladas e seus tokens ficam no banco SQLite de token_store.py.
+CUSTOM_VALUES_CACHE_FILE = os.path.join(os.path.dirname(__file__), "..", "custom_values_cache.json")
 
 # --- Carregamento Seguro das Credenciais do .env ---
 AGENCY_COMPANY_ID     = os.getenv("AGENCY_COMPANY_ID", "").strip()
@@ -32,6 +39,15 @@ APP_ID                = os.getenv("APP_ID", "").strip()
 REFRESH_CLIENT_ID     = os.getenv("REFRESH_CLIENT_ID", "").strip()
 REFRESH_CLIENT_SECRET = os.getenv("REFRESH_CLIENT_SECRET", "").strip()
 
+# --- Concorrência ---
+# Número máximo de requisições simultâneas ao gerar os tokens das localizações.
+DEFAULT_MAX_WORKERS = int(os.getenv("GHL_MAX_WORKERS", "8"))
+
+# --- Cache do índice nome -> ID dos Valores Personalizados ---
+# Validade (em segundos) do índice salvo em disco. Dentro de uma mesma execução
+# o índice é buscado no máximo uma vez por localização.
+CUSTOM_VALUES_CACHE_TTL = int(os.getenv("GHL_CUSTOM_VALUES_CACHE_TTL", "3600"))
+
 # ==============================================================================
 # 2. FUNÇÕES AUXILIARES (HELPERS)
 # ==============================================================================
@@ -53,9 +69,24 @@ def _load_json(path: str) -> Optional[dict]:
 def _save_json(path: str, data: dict) -> None:
     """
     Função para salvar um dicionário como um arquivo JSON formatado no disco.
+    A escrita é atômica: grava em um arquivo temporário e o renomeia por cima do original,
+    de modo que um leitor concorrente nunca veja um arquivo truncado.
     """
-    with open(path, "w", encoding="utf-8") as f:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Percentil por interpolação linear sobre uma lista já ordenada.
+    """
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
 
 # ==============================================================================
 # 3. FUNÇÕES PRINCIPAIS DE INTERAÇÃO COM A API
@@ -82,7 +113,7 @@ def refresh_agency_token() -> bool:
     headers = {"Content-Type": "application/x-www-form-urlencoded", "Accept": "application/json"}
 
     try:
-        resp = requests.post(f"{API_BASE_URL}/oauth/token", data=payload, headers=headers, timeout=30)
+        resp = ghl_request("POST", f"{API_BASE_URL}/oauth/token", rate_key="agency", data=payload, headers=headers, timeout=30)
         resp.raise_for_status()
         new_token_data = resp.json()
         
@@ -123,12 +154,25 @@ def get_installed_locations() -> bool:
     params = {"isInstalled": "true", "companyId": AGENCY_COMPANY_ID, "appId": APP_ID}
 
     try:
-        resp = requests.get(f"{API_BASE_URL}/oauth/installedLocations", headers=headers, params=params, timeout=30)
+        resp = ghl_request("GET", f"{API_BASE_URL}/oauth/installedLocations", rate_key="agency", headers=headers, params=params, timeout=30)
         resp.raise_for_status()
         data = resp.json()
 
         locations_list = data.get("locations", []) if isinstance(data, dict) else data
-        _save_json(LOCATIONS_DATA_FILE, {"locations": locations_list})
+
+        # Preserva os tokens já obtidos para as localizações que continuam instaladas,
+        # para que eles possam ser reaproveitados enquanto forem válidos.
+        previous = token_store.load_locations_data() or {}
+        previous_tokens = {
+            (loc.get("_id") or loc.get("id")): loc["location_specific_token_data"]
+            for loc in previous.get("locations", []) if loc.get("location_specific_token_data")
+        }
+        for loc in locations_list:
+            token_data = previous_tokens.get(loc.get("_id") or loc.get("id"))
+            if token_data and "location_specific_token_data" not in loc:
+                loc["location_specific_token_data"] = token_data
+
+        token_store.save_locations_data({"locations": locations_list, "fetched_at_unix_timestamp": int(time.time())})
         print(f">>> [GHL] {len(locations_list)} localização(ões) instalada(s) encontrada(s).")
         return True
     except requests.exceptions.HTTPError as http_err:
@@ -139,18 +183,66 @@ def get_installed_locations() -> bool:
         print(f"!!! [GHL] Erro inesperado em get_installed_locations: {e}")
         return False
 
-def manage_location_tokens() -> bool:
+def _request_location_token(loc: dict, headers: dict) -> Tuple[bool, float]:
+    """
+    Solicita o token de uma única localização e grava o resultado (ou o erro)
+    em loc["location_specific_token_data"], persistindo a localização imediatamente.
+    Um erro nunca substitui um token já salvo: ele continua em uso até expirar.
+    Retorna (sucesso, latência da requisição em segundos).
+    """
+    location_id = loc.get("_id") or loc.get("id")
+    if not location_id:
+        loc["location_specific_token_data"] = {"error": "ID da localização não encontrado no objeto"}
+        return False, 0.0
+
+    payload = {"companyId": AGENCY_COMPANY_ID, "locationId": location_id}
+    started = time.perf_counter()
+    error = None
+
+    try:
+        # Repetir o pedido só emite outro token para a localização: é seguro mesmo sendo um POST.
+        resp = ghl_request("POST", f"{API_BASE_URL}/oauth/locationToken", rate_key="agency", retry_safe=True,
+                           data=payload, headers=headers, timeout=20)
+        resp.raise_for_status()
+        token_data = resp.json()
+        token_data["refreshed_at_unix_timestamp"] = int(time.time())
+        loc["location_specific_token_data"] = token_data
+    except requests.exceptions.HTTPError as http_err:
+        error = {"error": str(http_err), "status_code": resp.status_code, "details": resp.text}
+        print(f"    !!! [GHL] ERRO HTTP ao obter token para Location {location_id}: Status {resp.status_code}")
+    except Exception as e:
+        error = {"error": str(e)}
+        print(f"    !!! [GHL] Erro inesperado para Location {location_id}: {e}")
+    latency = time.perf_counter() - started
+
+    if error is not None:
+        if (loc.get("location_specific_token_data") or {}).get("access_token"):
+            print(f"    ... [GHL] Mantendo o token anterior da Location {location_id}.")
+            return False, latency
+        loc["location_specific_token_data"] = error
+
+    # Grava a localização assim que ela é processada: uma falha no meio do lote
+    # não descarta os tokens já obtidos.
+    token_store.update_location_token(location_id, loc["location_specific_token_data"])
+    return error is None, latency
+
+def manage_location_tokens(max_workers: Optional[int] = None, location_ids: Optional[List[str]] = None) -> bool:
     """
     Para cada localização encontrada, solicita um token de acesso específico para ela.
+    As requisições são feitas em paralelo (no máximo 'max_workers' simultâneas),
+    compartilhando o mesmo pool de conexões.
+    Se 'location_ids' for informado, apenas essas localizações são renovadas; as demais
+    mantêm os tokens já salvos.
+    Retorna False se o token de alguma localização não pôde ser obtido.
     """
     agency_token_json = _load_json(AGENCY_TOKEN_FILE)
     if not agency_token_json or "access_token" not in agency_token_json:
         print(f"!!! [GHL] ERRO: Não foi possível carregar o token da agência para gerenciar os tokens de localização.")
         return False
 
-    locations_data = _load_json(LOCATIONS_DATA_FILE)
+    locations_data = token_store.load_locations_data()
     if not locations_data or "locations" not in locations_data:
-        print(f"!!! [GHL] ERRO: Arquivo de dados das localizações '{LOCATIONS_DATA_FILE}' não encontrado ou inválido.")
+        print(f"!!! [GHL] ERRO: Nenhuma localização salva em '{token_store.LOCATIONS_DB_FILE}'. Execute get_installed_locations() antes.")
         return False
 
     headers = {
@@ -159,40 +251,117 @@ def manage_location_tokens() -> bool:
         "Content-Type": "application/x-www-form-urlencoded",
         "Accept": "application/json"
     }
-    
-    updated_locations = []
-    for loc in locations_data.get("locations", []):
-        location_id = loc.get("_id") or loc.get("id")
-        if not location_id:
-            loc["location_specific_token_data"] = {"error": "ID da localização não encontrado no objeto"}
-            updated_locations.append(loc)
-            continue
-
-        payload = {"companyId": AGENCY_COMPANY_ID, "locationId": location_id}
-
-        try:
-            resp = requests.post(f"{API_BASE_URL}/oauth/locationToken", data=payload, headers=headers, timeout=20)
-            resp.raise_for_status()
-            loc["location_specific_token_data"] = resp.json()
-        except requests.exceptions.HTTPError as http_err:
-            loc["location_specific_token_data"] = {"error": str(http_err), "status_code": resp.status_code, "details": resp.text}
-            print(f"    !!! [GHL] ERRO HTTP ao obter token para Location {location_id}: Status {resp.status_code}")
-        except Exception as e:
-            loc["location_specific_token_data"] = {"error": str(e)}
-            print(f"    !!! [GHL] Erro inesperado para Location {location_id}: {e}")
-        
-        updated_locations.append(loc)
 
-    _save_json(LOCATIONS_DATA_FILE, {"locations": updated_locations})
+    locations = locations_data.get("locations", [])
+    wanted = set(location_ids) if location_ids is not None else None
+    targets = [loc for loc in locations if wanted is None or (loc.get("_id") or loc.get("id")) in wanted]
+    workers = max(1, max_workers or DEFAULT_MAX_WORKERS)
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda loc: _request_location_token(loc, headers), targets))
+
+    elapsed = time.perf_counter() - started
+
+    failed = sum(1 for ok, _ in results if not ok)
+    timed = sorted(latency for _, latency in results if latency > 0)
+    print(f">>> [GHL] {len(targets)} token(s) de localização processado(s) em {elapsed:.2f}s com {workers} worker(s).")
+    if timed:
+        print(f"    Latência por requisição: p50={_percentile(timed, 50) * 1000:.0f}ms "
+              f"p90={_percentile(timed, 90) * 1000:.0f}ms p99={_percentile(timed, 99) * 1000:.0f}ms "
+              f"max={timed[-1] * 1000:.0f}ms")
+    if failed:
+        print(f"!!! [GHL] {failed} de {len(targets)} token(s) de localização não puderam ser obtidos.")
+        return False
     return True
 
 # ==============================================================================
 # 4. FUNÇÕES DE LÓGICA DE NEGÓCIO
 # ==============================================================================
 
-def update_single_custom_value(location_id: str, access_token: str, custom_value_name: str, new_content: str) -> bool:
+# Índice em memória: location_id -> {"fetched_at": timestamp, "values": {nome: id}}
+_custom_value_index: dict = {}
+_custom_value_index_loaded = False
+_custom_value_index_lock = threading.RLock()
+_custom_value_fetch_locks: dict = {}
+
+def _save_custom_value_index() -> None:
+    with _custom_value_index_lock:
+        _save_json(CUSTOM_VALUES_CACHE_FILE, _custom_value_index)
+
+def _cached_custom_value_index(location_id: str) -> Optional[dict]:
+    """
+    Retorna o índice nome -> ID da localização se ele estiver em memória (ou no
+    cache em disco) e dentro do TTL. Caso contrário, retorna None.
+    """
+    global _custom_value_index_loaded
+    with _custom_value_index_lock:
+        if not _custom_value_index_loaded:
+            _custom_value_index.update(_load_json(CUSTOM_VALUES_CACHE_FILE) or {})
+            _custom_value_index_loaded = True
+        entry = _custom_value_index.get(location_id)
+        if entry and time.time() - entry.get("fetched_at", 0) < CUSTOM_VALUES_CACHE_TTL:
+            return entry["values"]
+        return None
+
+def invalidate_custom_value_index(location_id: str) -> None:
+    """
+    Descarta o índice de uma localização (ex.: um PUT retornou 404 para um ID conhecido).
+    """
+    with _custom_value_index_lock:
+        if _custom_value_index.pop(location_id, None) is not None:
+            _save_custom_value_index()
+
+def _remember_custom_value_id(location_id: str, custom_value_name: str, value_id: str) -> None:
+    with _custom_value_index_lock:
+        entry = _custom_value_index.get(location_id)
+        if entry is not None:
+            entry["values"][custom_value_name] = value_id
+            _save_custom_value_index()
+
+def _get_custom_value_index(location_id: str, headers: dict, token_refresher: Optional[Callable[[Optional[str]], Optional[str]]] = None) -> Optional[dict]:
+    """
+    Retorna o índice nome -> ID dos Valores Personalizados da localização.
+    A listagem na API só é feita quando não há índice válido em memória/disco; chamadas
+    simultâneas para a mesma localização aguardam uma única listagem.
+    Falhas na listagem são propagadas (requests.exceptions.*) para quem chama.
+    """
+    index = _cached_custom_value_index(location_id)
+    if index is not None:
+        return index
+
+    with _custom_value_index_lock:
+        fetch_lock = _custom_value_fetch_locks.setdefault(location_id, threading.Lock())
+
+    with fetch_lock:
+        index = _cached_custom_value_index(location_id)
+        if index is not None:
+            return index
+
+        list_url = f"{API_BASE_URL}/locations/{location_id}/customValues"
+        resp = ghl_request("GET", list_url, rate_key=location_id, auth_refresher=token_refresher, headers=headers, timeout=20)
+        resp.raise_for_status()
+        existing_values = resp.json().get("customValues", [])
+
+        index = {value.get("name"): value.get("id") for value in existing_values if value.get("name")}
+        with _custom_value_index_lock:
+            _custom_value_index[location_id] = {"fetched_at": int(time.time()), "values": index}
+            _save_custom_value_index()
+        return index
+
+def upsert_custom_value(location_id: str, access_token: str, custom_value_name: str, new_content: str,
+                        existing_value_id: Optional[str] = None,
+                        token_refresher: Optional[Callable[[Optional[str]], Optional[str]]] = None) -> Tuple[Optional[str], Optional[int]]:
     """
     Cria ou atualiza um "Valor Personalizado" (Custom Value) em uma localização específica.
+    O ID é resolvido pelo 'existing_value_id' informado ou pelo índice nome -> ID da
+    localização, sem listar os valores a cada chamada. Um PUT que retorna 404 invalida
+    o índice e força uma nova listagem.
+    'token_refresher', se informado, é chamado uma vez quando a API responder 401 (recebendo
+    o token recusado) e deve retornar um novo access_token para a localização.
+    Retorna (ID, status): o ID do Valor Personalizado (None em caso de falha) e o status HTTP
+    da última resposta, NO_RESPONSE_STATUS se não houve resposta (conexão ou tempo esgotado)
+    ou None para outros erros. Use ghl_http.is_transient_status() para decidir se vale repetir.
     """
     print(f"\n--- [GHL] Iniciando atualização do Valor Personalizado '{custom_value_name}' para a Location ID: {location_id} ---")
 
@@ -203,51 +372,66 @@ def update_single_custom_value(location_id: str, access_token: str, custom_value
         "Content-Type": "application/json"
     }
 
-    list_url = f"{API_BASE_URL}/locations/{location_id}/customValues"
-    existing_value_id = None
-    
+    # A API do GHL exige o campo 'name' mesmo na atualização (PUT).
+    payload = {"name": custom_value_name, "value": new_content}
+    tried_ids = set()
+    creating = False
+
     try:
-        resp = requests.get(list_url, headers=headers, timeout=20)
-        resp.raise_for_status()
-        existing_values = resp.json().get("customValues", [])
-        
-        for value in existing_values:
-            if value.get("name") == custom_value_name:
-                existing_value_id = value.get("id")
-                print(f"    -> Valor Personalizado '{custom_value_name}' já existe com ID: {existing_value_id}. Será atualizado.")
+        while True:
+            value_id = existing_value_id
+            existing_value_id = None
+            if not value_id:
+                value_id = _get_custom_value_index(location_id, headers, token_refresher).get(custom_value_name)
+
+            if not value_id or value_id in tried_ids:
                 break
-    except requests.exceptions.HTTPError as http_err:
-        print(f"!!! [GHL] ERRO HTTP ao listar Valores Personalizados: {http_err}")
-        print(f"    Detalhes: {resp.text}")
-        return False
-    except Exception as e:
-        print(f"!!! [GHL] Erro inesperado ao listar Valores Personalizados: {e}")
-        return False
 
-    try:
-        if existing_value_id:
-            update_url = f"{API_BASE_URL}/locations/{location_id}/customValues/{existing_value_id}"
-            
-            # <<< CORREÇÃO APLICADA AQUI >>>
-            # Adicionamos o 'name' ao payload, pois a API do GHL exige este campo mesmo na atualização (PUT).
-            payload = {"name": custom_value_name, "value": new_content}
-            
-            resp = requests.put(update_url, headers=headers, json=payload, timeout=30)
+            print(f"    -> Valor Personalizado '{custom_value_name}' já existe com ID: {value_id}. Será atualizado.")
+            tried_ids.add(value_id)
+            update_url = f"{API_BASE_URL}/locations/{location_id}/customValues/{value_id}"
+            resp = ghl_request("PUT", update_url, rate_key=location_id, auth_refresher=token_refresher, headers=headers, json=payload, timeout=30)
+            if resp.status_code == 404:
+                print(f"    -> ID {value_id} não existe mais na localização. Atualizando o índice.")
+                invalidate_custom_value_index(location_id)
+                continue
             resp.raise_for_status()
+            _remember_custom_value_id(location_id, custom_value_name, value_id)
             print(f"    <- [GHL] SUCESSO: Valor Personalizado '{custom_value_name}' atualizado.")
+            return value_id, resp.status_code
+
+        creating = True
+        create_url = f"{API_BASE_URL}/locations/{location_id}/customValues"
+        resp = ghl_request("POST", create_url, rate_key=location_id, auth_refresher=token_refresher, headers=headers, json=payload, timeout=30)
+        resp.raise_for_status()
+        print(f"    <- [GHL] SUCESSO: Valor Personalizado '{custom_value_name}' criado.")
+        body = resp.json() if resp.content else {}
+        created = body.get("customValue", body) if isinstance(body, dict) else {}
+        value_id = created.get("id")
+        if value_id:
+            _remember_custom_value_id(location_id, custom_value_name, value_id)
         else:
-            create_url = f"{API_BASE_URL}/locations/{location_id}/customValues"
-            payload = {"name": custom_value_name, "value": new_content}
-            resp = requests.post(create_url, headers=headers, json=payload, timeout=30)
-            resp.raise_for_status()
-            print(f"    <- [GHL] SUCESSO: Valor Personalizado '{custom_value_name}' criado.")
-        
-        return True
-    
+            invalidate_custom_value_index(location_id)
+        return value_id or "", resp.status_code
+
     except requests.exceptions.HTTPError as http_err:
         print(f"!!! [GHL] ERRO HTTP ao salvar o Valor Personalizado: {http_err}")
-        print(f"    Detalhes: {resp.text}")
-        return False
+        print(f"    Detalhes: {http_err.response.text}")
+        return None, http_err.response.status_code
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        print(f"!!! [GHL] Falha de conexão ao salvar o Valor Personalizado: {e}")
+        if creating:
+            # O POST pode ter sido processado: a próxima tentativa lista os valores de novo
+            # em vez de criar um segundo valor com o mesmo nome.
+            invalidate_custom_value_index(location_id)
+        return None, NO_RESPONSE_STATUS
     except Exception as e:
         print(f"!!! [GHL] Erro inesperado ao salvar o Valor Personalizado: {e}")
-        return False
\ No newline at end of file
+        return None, None
+
+def update_single_custom_value(location_id: str, access_token: str, custom_value_name: str, new_content: str) -> bool:
+    """
+    Cria ou atualiza um "Valor Personalizado" (Custom Value) em uma localização específica.
+    """
+    value_id, _status = upsert_custom_value(location_id, access_token, custom_value_name, new_content)
+    return value_id is not None
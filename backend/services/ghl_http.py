@@ -0,0 +1,350 @@
+# backend/services/ghl_http.py
+
+import os
+import time
+import random
+import threading
+import http.client
+import requests
+from typing import Callable, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
+
+from . import metrics
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Limites documentados do GHL para apps do Marketplace: rajada de 100 requisições
+# a cada 10 segundos e 200.000 por dia, por recurso (agência ou localização).
+# Os valores são ajustados em tempo de execução a partir dos cabeçalhos X-RateLimit-*.
+DEFAULT_BURST_LIMIT = int(os.getenv("GHL_BURST_LIMIT", "100"))
+DEFAULT_BURST_INTERVAL = float(os.getenv("GHL_BURST_INTERVAL_SECONDS", "10"))
+
+# Cota diária: abaixo de GHL_DAILY_SLOWDOWN_BELOW requisições restantes o ritmo do bucket é
+# reduzido em proporção ao que sobra; com GHL_DAILY_RESERVE ou menos, novas requisições são
+# recusadas (DailyQuotaExhausted) até GHL_DAILY_BLOCK_SECONDS depois da última resposta,
+# quando uma nova requisição volta a consultar o saldo.
+DAILY_SLOWDOWN_BELOW = int(os.getenv("GHL_DAILY_SLOWDOWN_BELOW", "10000"))
+DAILY_RESERVE = int(os.getenv("GHL_DAILY_RESERVE", "500"))
+DAILY_BLOCK_SECONDS = float(os.getenv("GHL_DAILY_BLOCK_SECONDS", "900"))
+# Fração mínima do ritmo normal enquanto a cota diária está baixa.
+DAILY_MIN_RATE_FACTOR = 0.01
+
+# Retentativas para respostas 429/5xx e falhas de conexão.
+MAX_RETRIES = int(os.getenv("GHL_MAX_RETRIES", "5"))
+BACKOFF_BASE = float(os.getenv("GHL_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX = float(os.getenv("GHL_BACKOFF_MAX_SECONDS", "30"))
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Só estes métodos são repetidos em qualquer status de RETRY_STATUS_CODES; veja _is_retryable().
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Status informado por quem chama quando não houve resposta (falha de conexão ou tempo esgotado).
+NO_RESPONSE_STATUS = 0
+
+# Tamanho do pool de conexões da sessão compartilhada.
+POOL_SIZE = max(int(os.getenv("GHL_MAX_WORKERS", "8")), 10)
+
+# ==============================================================================
+# 2. SESSÃO COMPARTILHADA
+# ==============================================================================
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Retorna uma sessão HTTP compartilhada (keep-alive), criada sob demanda.
+    O pool de conexões é dimensionado para o número máximo de workers, de modo
+    que as threads reaproveitem as conexões TCP/TLS em vez de abrir uma por chamada.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+# ==============================================================================
+# 3. CONTROLE DE TAXA (TOKEN BUCKET)
+# ==============================================================================
+
+class DailyQuotaExhausted(requests.exceptions.RequestException):
+    """
+    A cota diária do recurso chegou a DAILY_RESERVE: a requisição não foi enviada.
+    """
+
+class TokenBucket:
+    """
+    Token bucket com capacidade igual à rajada permitida e reposição contínua.
+    A capacidade, a taxa e o saldo são corrigidos pelos cabeçalhos de cada resposta;
+    com a cota diária baixa, a reposição desacelera (veja DAILY_SLOWDOWN_BELOW).
+    """
+
+    def __init__(self, capacity: int, interval: float):
+        self.capacity = float(capacity)
+        self.rate = capacity / interval
+        self.tokens = float(capacity)
+        self.daily_remaining: Optional[int] = None
+        self._daily_updated = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _daily_factor(self) -> float:
+        remaining = self.daily_remaining
+        if remaining is None or remaining >= DAILY_SLOWDOWN_BELOW:
+            return 1.0
+        span = max(1, DAILY_SLOWDOWN_BELOW - DAILY_RESERVE)
+        return max(DAILY_MIN_RATE_FACTOR, min(1.0, (remaining - DAILY_RESERVE) / span))
+
+    def effective_rate(self) -> float:
+        """
+        Taxa de reposição (tokens/s) já considerando a cota diária restante.
+        """
+        return self.rate * self._daily_factor()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.effective_rate())
+        self._updated = now
+
+    def daily_blocked(self) -> bool:
+        """
+        True enquanto a cota diária está na reserva e a última leitura dela é recente.
+        """
+        with self._lock:
+            return (self.daily_remaining is not None and self.daily_remaining <= DAILY_RESERVE
+                    and time.monotonic() - self._daily_updated < DAILY_BLOCK_SECONDS)
+
+    def acquire(self) -> float:
+        """
+        Consome um token, aguardando se necessário. Retorna o tempo de espera (s).
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.effective_rate()
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds: float) -> None:
+        """
+        Esvazia o bucket para que as próximas requisições aguardem 'seconds'.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.effective_rate())
+
+    def update_from_headers(self, headers) -> None:
+        try:
+            limit = headers.get("X-RateLimit-Max")
+            interval_ms = headers.get("X-RateLimit-Interval-Milliseconds")
+            remaining = headers.get("X-RateLimit-Remaining")
+            daily_remaining = headers.get("X-RateLimit-Daily-Remaining")
+            with self._lock:
+                self._refill()
+                if limit and interval_ms and int(interval_ms) > 0:
+                    self.capacity = float(limit)
+                    self.rate = int(limit) / (int(interval_ms) / 1000.0)
+                if remaining is not None:
+                    self.tokens = min(self.tokens, float(remaining))
+                if daily_remaining is not None:
+                    self.daily_remaining = int(daily_remaining)
+                    self._daily_updated = time.monotonic()
+        except (TypeError, ValueError):
+            pass
+
+_buckets: dict = {}
+_buckets_lock = threading.Lock()
+
+def _get_bucket(rate_key: str) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(rate_key)
+        if bucket is None:
+            bucket = _buckets[rate_key] = TokenBucket(DEFAULT_BURST_LIMIT, DEFAULT_BURST_INTERVAL)
+        return bucket
+
+# ==============================================================================
+# 4. CONTADORES
+# ==============================================================================
+
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "server_errors": 0,
+    "connection_errors": 0,
+    "auth_refreshes": 0,
+    "throttle_waits": 0,
+    "throttle_wait_seconds": 0.0,
+    "daily_quota_blocked": 0,
+}
+
+def _count(key: str, amount=1) -> None:
+    with _stats_lock:
+        _stats[key] += amount
+
+def get_http_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["daily_remaining"] = {key: b.daily_remaining for key, b in _buckets.items() if b.daily_remaining is not None}
+    return stats
+
+def reset_http_stats() -> None:
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0.0 if isinstance(_stats[key], float) else 0
+
+def print_http_stats() -> None:
+    stats = get_http_stats()
+    print(f">>> [HTTP] Requisições: {stats['requests']} | Retentativas: {stats['retries']} | "
+          f"429: {stats['rate_limited']} | 5xx: {stats['server_errors']} | Falhas de conexão: {stats['connection_errors']} | "
+          f"Tokens renovados após 401: {stats['auth_refreshes']}")
+    print(f"    Esperas do limitador: {stats['throttle_waits']} ({stats['throttle_wait_seconds']:.2f}s) | "
+          f"Recusadas pela cota diária: {stats['daily_quota_blocked']}")
+    for key, remaining in stats["daily_remaining"].items():
+        print(f"    Cota diária restante [{key}]: {remaining}")
+
+# ==============================================================================
+# 5. REQUISIÇÃO
+# ==============================================================================
+
+def is_transient_status(status: Optional[int]) -> bool:
+    """
+    True para falhas que costumam passar sozinhas (429, 5xx e falhas de rede) e que vale
+    repetir mais tarde; False para erros permanentes (400, 401, 403, 404, ...).
+    """
+    return status == NO_RESPONSE_STATUS or status in RETRY_STATUS_CODES
+
+def _retry_delay(attempt: int, resp: Optional[requests.Response]) -> float:
+    """
+    Backoff exponencial com jitter completo; respeita o cabeçalho Retry-After quando presente.
+    """
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), BACKOFF_MAX)
+            except ValueError:
+                pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _is_retryable(method: str, resp: requests.Response, retry_safe: bool = False) -> bool:
+    """
+    Métodos idempotentes são repetidos em qualquer status de RETRY_STATUS_CODES. Um POST
+    (ex.: /oauth/token, que rotaciona o refresh token, ou a criação de um Valor Personalizado)
+    só é repetido quando a API indica que não o processou: 429, ou 503 com Retry-After.
+    'retry_safe' marca um POST que pode ser repetido como um método idempotente
+    (ex.: /oauth/locationToken, que só emite um token novo).
+    """
+    if retry_safe or method.upper() in IDEMPOTENT_METHODS:
+        return resp.status_code in RETRY_STATUS_CODES
+    return resp.status_code == 429 or (resp.status_code == 503 and bool(resp.headers.get("Retry-After")))
+
+def _failed_before_sending(exc: requests.exceptions.RequestException) -> bool:
+    """
+    True quando a falha aconteceu antes de a requisição sair (tempo esgotado na conexão,
+    conexão recusada, DNS). Tempo esgotado na leitura ou conexão derrubada pelo servidor
+    (RemoteDisconnected, ProtocolError) chegam depois do envio: a API pode ter processado o pedido.
+    """
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ReadTimeout) or not isinstance(exc, requests.exceptions.ConnectionError):
+        return False
+    reason = exc.args[0] if exc.args else None
+    # Falhas que passaram pelas retentativas do urllib3 chegam embrulhadas em MaxRetryError.
+    reason = getattr(reason, "reason", reason)
+    return not isinstance(reason, (ProtocolError, ReadTimeoutError, http.client.HTTPException, ConnectionResetError))
+
+def ghl_request(method: str, url: str, rate_key: str = "default", max_retries: Optional[int] = None,
+                auth_refresher: Optional[Callable[[Optional[str]], Optional[str]]] = None,
+                retry_safe: bool = False, **kwargs) -> requests.Response:
+    """
+    Ponto único de saída para a API do GHL.
+    - Aguarda um token do bucket de 'rate_key' (ex.: a agência ou a localização).
+    - Repete respostas 429/5xx e falhas de conexão com backoff exponencial e jitter
+      (um POST só em 429 ou 503 com Retry-After, e só em falhas de conexão anteriores ao
+      envio; veja _is_retryable e _failed_before_sending). Com 'retry_safe', quem chama
+      garante que repetir o POST não tem efeito colateral e ele é tratado como um GET.
+    - Com a cota diária do recurso na reserva, lança DailyQuotaExhausted sem enviar nada.
+    - Em um 401, se 'auth_refresher' for informado, ele é chamado com o token recusado
+      e deve retornar um token novo; a requisição é repetida uma vez.
+      O cabeçalho Authorization do dict 'headers' recebido é atualizado no lugar, para
+      que as chamadas seguintes de quem chama já usem o token novo.
+    Retorna a última resposta recebida; quem chama decide o que fazer com o status
+    (normalmente resp.raise_for_status()). Falhas de conexão na última tentativa são propagadas.
+    """
+    retries = MAX_RETRIES if max_retries is None else max_retries
+    bucket = _get_bucket(rate_key)
+    session = get_session()
+
+    attempt = 0
+    while True:
+        if bucket.daily_blocked():
+            _count("daily_quota_blocked")
+            metrics.inc("http_daily_quota_blocked_total", route=metrics.route_for(url, None))
+            raise DailyQuotaExhausted(f"Cota diária de '{rate_key}' na reserva ({bucket.daily_remaining} restantes).")
+        waited = bucket.acquire()
+        if waited > 0:
+            _count("throttle_waits")
+            _count("throttle_wait_seconds", waited)
+
+        _count("requests")
+        started = time.perf_counter()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+            _count("connection_errors")
+            metrics.record_http(method, url, "error", time.perf_counter() - started, attempt=attempt,
+                                rate_key=rate_key, error=type(exc).__name__)
+            # Um POST que já tinha saído pode ter sido processado; repetir poderia duplicar o recurso.
+            idempotent = retry_safe or method.upper() in IDEMPOTENT_METHODS
+            if attempt >= retries or not (idempotent or _failed_before_sending(exc)):
+                raise
+            _count("retries")
+            metrics.record_retry(url, "connection")
+            time.sleep(_retry_delay(attempt, None))
+            attempt += 1
+            continue
+
+        metrics.record_http(method, url, resp.status_code, time.perf_counter() - started,
+                            request_bytes=len(resp.request.body or b"") if resp.request is not None else 0,
+                            response_bytes=len(resp.content), attempt=attempt, rate_key=rate_key,
+                            throttle_wait_ms=round(waited * 1000, 3))
+        bucket.update_from_headers(resp.headers)
+        if resp.status_code == 401 and auth_refresher is not None and kwargs.get("headers") is not None:
+            # A renovação do token é feita no máximo uma vez e não consome uma tentativa.
+            refresher, auth_refresher = auth_refresher, None
+            failed_token = kwargs["headers"].get("Authorization", "").replace("Bearer ", "", 1) or None
+            new_token = refresher(failed_token)
+            if new_token:
+                _count("auth_refreshes")
+                metrics.record_retry(url, "auth")
+                print(f"    ... [HTTP] {method} {url} retornou 401. Token renovado; repetindo a requisição.")
+                kwargs["headers"]["Authorization"] = f"Bearer {new_token}"
+                continue
+
+        if attempt >= retries or not _is_retryable(method, resp, retry_safe):
+            return resp
+
+        delay = _retry_delay(attempt, resp)
+        _count("retries")
+        metrics.record_retry(url, str(resp.status_code))
+        print(f"    ... [HTTP] {method} {url} retornou {resp.status_code}. Nova tentativa em {delay:.2f}s "
+              f"({attempt + 1}/{retries}).")
+        if resp.status_code == 429:
+            # Pausa o bucket inteiro: todas as threads que usam este recurso aguardam juntas.
+            _count("rate_limited")
+            bucket.pause(delay)
+        else:
+            _count("server_errors")
+            time.sleep(delay)
+        attempt += 1
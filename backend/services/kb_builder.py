@@ -0,0 +1,115 @@
+# backend/services/kb_builder.py
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+from .ghl_client import _load_json, _save_json
+from .knowledge_base import ordered_records, generate_summary_line, generate_complete_line
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Estado da última geração: fingerprint e linhas renderizadas de cada listingID,
+# além da ordem final dos IDs nas bases.
+KB_STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "kb_state.json")
+
+# ==============================================================================
+# 2. FUNÇÕES AUXILIARES
+# ==============================================================================
+
+def record_fingerprint(record: dict) -> str:
+    """
+    Fingerprint do conteúdo do registro (independe da ordem das chaves).
+    """
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def empty_changeset() -> dict:
+    return {"added": [], "changed": [], "removed": [], "reordered": False}
+
+def changeset_has_changes(changeset: dict) -> bool:
+    return bool(changeset["added"] or changeset["changed"] or changeset["removed"] or changeset["reordered"])
+
+# ==============================================================================
+# 3. CONSTRUTOR INCREMENTAL
+# ==============================================================================
+
+class IncrementalKnowledgeBaseBuilder:
+    """
+    Gera base_resumida/base_completa reaproveitando as linhas da execução anterior:
+    somente imóveis novos ou alterados são renderizados de novo. Além das bases,
+    produz um changeset (IDs adicionados, alterados e removidos).
+    O estado só é persistido quando save() é chamado, para que uma publicação que
+    falhe não esconda as mudanças da execução seguinte.
+    """
+
+    def __init__(self, state_file: Optional[str] = None):
+        self.state_file = state_file or KB_STATE_FILE
+        state = _load_json(self.state_file) or {}
+        self._previous: Dict[str, dict] = state.get("listings", {})
+        self._previous_order: List[str] = state.get("order", [])
+        # SHA-256 do último feed processado com sucesso (veja feed_cache.fetch_feed).
+        self.feed_sha256: Optional[str] = state.get("feed_sha256")
+        self._next_state: Optional[dict] = None
+        self.rendered = 0
+        self.reused = 0
+
+    def build(self, categories: Dict[str, List[dict]]) -> dict:
+        """
+        Recebe as categorias (como em categorize_listings) e retorna
+        {"base_resumida", "base_completa", "changeset"} na mesma ordem do gerador original.
+        """
+        summary_lines = []
+        complete_lines = []
+        entries: Dict[str, dict] = {}
+        order: List[str] = []
+        changeset = empty_changeset()
+
+        for record in ordered_records(categories):
+            listing_id = record.get("listingID")
+            fingerprint = record_fingerprint(record)
+            cached = self._previous.get(listing_id) if listing_id else None
+
+            if cached and cached.get("fingerprint") == fingerprint:
+                summary, complete = cached["summary"], cached["complete"]
+                self.reused += 1
+            else:
+                summary, complete = generate_summary_line(record), generate_complete_line(record)
+                self.rendered += 1
+                if listing_id and listing_id not in entries:
+                    (changeset["changed"] if cached else changeset["added"]).append(listing_id)
+
+            summary_lines.append(summary)
+            complete_lines.append(complete)
+            # IDs ausentes ou repetidos não entram no cache (não há chave estável para eles).
+            if listing_id and listing_id not in entries:
+                entries[listing_id] = {"fingerprint": fingerprint, "summary": summary, "complete": complete}
+                order.append(listing_id)
+
+        changeset["removed"] = [listing_id for listing_id in self._previous if listing_id not in entries]
+        # Mudança só de posição (ex.: um imóvel trocou de categoria ou o feed mudou a ordem)
+        # também altera as bases, mesmo sem conteúdo novo.
+        kept_now = [listing_id for listing_id in order if listing_id in self._previous]
+        kept_before = [listing_id for listing_id in self._previous_order if listing_id in entries]
+        changeset["reordered"] = kept_now != kept_before
+
+        self._next_state = {"listings": entries, "order": order}
+        return {
+            "base_resumida": "\n".join(summary_lines).strip(),
+            "base_completa": "\n".join(complete_lines).strip(),
+            "changeset": changeset,
+        }
+
+    def save(self, feed_sha256: Optional[str] = None) -> None:
+        """
+        Persiste o estado da última chamada a build() e, se informado, o hash do feed de origem.
+        """
+        if self._next_state is not None:
+            self._next_state["feed_sha256"] = feed_sha256
+            self.feed_sha256 = feed_sha256
+            _save_json(self.state_file, self._next_state)
+            self._previous = self._next_state["listings"]
+            self._previous_order = self._next_state["order"]
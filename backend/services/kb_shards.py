@@ -0,0 +1,206 @@
+# backend/services/kb_shards.py
+
+import os
+import re
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+from .batch_publisher import publish_to_locations
+from .sync_state import content_hash, load_sync_state, synced_values
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Tamanho máximo (bytes UTF-8) de cada parte. Um único imóvel maior que isso fica sozinho na parte.
+SHARD_MAX_BYTES = int(os.getenv("GHL_SHARD_MAX_BYTES", "16384"))
+# Média de imóveis por parte. As fronteiras são escolhidas pelo hash do listingID e cada
+# parte leva o nome do primeiro imóvel dela, então alterar, incluir ou remover um imóvel
+# afeta só a parte em que ele está (ou, quando o limite de bytes força um corte, as partes
+# até a próxima fronteira); as demais mantêm nome e conteúdo.
+SHARD_AVG_LINES = int(os.getenv("GHL_SHARD_AVG_LINES", "24"))
+
+# As partes de uma base vão todas para a mesma localização: elas são enviadas com mais
+# paralelismo por localização do que os valores avulsos (o ritmo por localização continua
+# limitado pelo token bucket de ghl_http).
+SHARD_PER_LOCATION_CONCURRENCY = int(os.getenv("GHL_SHARD_PER_LOCATION_CONCURRENCY", "4"))
+SHARD_PER_LOCATION_INTERVAL = float(os.getenv("GHL_SHARD_PER_LOCATION_INTERVAL", "0.1"))
+
+# Nomes: <base>_shard_<listingID da primeira linha> e <base>_manifest. O nome de uma parte
+# muda quando o imóvel que a abre sai da base, então ninguém deve referenciar uma parte
+# diretamente (ex.: {{custom_values.<base>_shard_123}} em um prompt): o único nome fixo é
+# <base>_manifest, que lista as partes atuais na ordem. Quem lê busca o manifest, depois as
+# partes listadas nele (GET /locations/{id}/customValues) e confere o sha256 da base remontada.
+# Prompts que precisam de um placeholder fixo continuam usando a base inteira (sem --sharded).
+MANIFEST_SUFFIX = "_manifest"
+SHARD_INFIX = "_shard_"
+_SHARD_NAME = re.compile(re.escape(SHARD_INFIX) + r"[0-9A-Za-z-]+$")
+_LINE_ID = re.compile(r"^# (\S+) [-=] ")
+_UNSAFE_KEY_CHARS = re.compile(r"[^0-9A-Za-z-]")
+
+# ==============================================================================
+# 2. DIVISÃO EM PARTES
+# ==============================================================================
+
+def _line_key(line: str) -> str:
+    """
+    listingID da linha, ou a linha inteira se ela não seguir o formato das bases.
+    """
+    match = _LINE_ID.match(line)
+    return match.group(1) if match else line
+
+def shard_key(shard: str) -> str:
+    """
+    Chave estável de uma parte: o listingID da primeira linha (só letras, dígitos e "-").
+    Linhas fora do formato das bases usam um hash curto do conteúdo.
+    """
+    first_line = shard.split("\n", 1)[0]
+    match = _LINE_ID.match(first_line)
+    key = _UNSAFE_KEY_CHARS.sub("", match.group(1))[:40] if match else ""
+    return key or "h" + hashlib.sha1(first_line.encode("utf-8")).hexdigest()[:10]
+
+def shard_names(base_name: str, shards: List[str]) -> List[str]:
+    """
+    Nomes das partes, na ordem. Chaves repetidas (listingID duplicado no feed)
+    recebem um sufixo "-2", "-3", ...
+    """
+    names = []
+    seen: Dict[str, int] = {}
+    for shard in shards:
+        key = shard_key(shard)
+        seen[key] = seen.get(key, 0) + 1
+        names.append(f"{base_name}{SHARD_INFIX}{key}" + (f"-{seen[key]}" if seen[key] > 1 else ""))
+    return names
+
+def _is_boundary(line: str, avg_lines: int) -> bool:
+    """
+    Fronteira definida pelo conteúdo: depende apenas do listingID da linha.
+    """
+    if avg_lines <= 1:
+        return True
+    return int(hashlib.sha1(_line_key(line).encode("utf-8")).hexdigest()[:8], 16) % avg_lines == 0
+
+def split_into_shards(content: str, max_bytes: Optional[int] = None, avg_lines: Optional[int] = None) -> List[str]:
+    """
+    Divide uma base (uma linha por imóvel) em partes de até 'max_bytes'. Uma parte termina
+    depois de uma linha de fronteira (veja _is_boundary) ou antes de estourar o limite.
+    Unir as partes com "\\n" devolve o conteúdo original.
+    """
+    max_bytes = max_bytes or SHARD_MAX_BYTES
+    avg_lines = avg_lines or SHARD_AVG_LINES
+    if not content:
+        return []
+
+    shards: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in content.split("\n"):
+        line_size = len(line.encode("utf-8"))
+        # +1 pelo "\n" que separa a linha da anterior.
+        if current and size + 1 + line_size > max_bytes:
+            shards.append("\n".join(current))
+            current, size = [], 0
+        size += line_size + (1 if current else 0)
+        current.append(line)
+        if _is_boundary(line, avg_lines):
+            shards.append("\n".join(current))
+            current, size = [], 0
+    if current:
+        shards.append("\n".join(current))
+    return shards
+
+def build_manifest(base_name: str, content: str, shards: List[str], names: Optional[List[str]] = None) -> str:
+    """
+    Valor <base>_manifest: a lista ordenada das partes (nome, bytes, linhas e hash) e o
+    hash da base completa, para quem lê remontar e validar o conteúdo.
+    """
+    names = names or shard_names(base_name, shards)
+    manifest = {
+        "version": 2,
+        "base": base_name,
+        "sha256": content_hash(content),
+        "bytes": len(content.encode("utf-8")),
+        "shards": [
+            {
+                "name": name,
+                "sha256": content_hash(shard),
+                "bytes": len(shard.encode("utf-8")),
+                "lines": shard.count("\n") + 1,
+            }
+            for name, shard in zip(names, shards)
+        ],
+    }
+    return json.dumps(manifest, ensure_ascii=False, separators=(",", ":"))
+
+def shard_knowledge_base(base_name: str, content: str, max_bytes: Optional[int] = None,
+                         avg_lines: Optional[int] = None) -> Dict[str, Dict[str, str]]:
+    """
+    Retorna {"shards": {nome: parte}, "manifest": {nome_do_manifest: json}}, com as partes na ordem da base.
+    """
+    shards = split_into_shards(content, max_bytes, avg_lines)
+    names = shard_names(base_name, shards)
+    return {
+        "shards": dict(zip(names, shards)),
+        "manifest": {f"{base_name}{MANIFEST_SUFFIX}": build_manifest(base_name, content, shards, names)},
+    }
+
+# ==============================================================================
+# 3. PUBLICAÇÃO
+# ==============================================================================
+
+def _stale_shards(sync_state: dict, location_id: str, base_names: List[str], active: Dict[str, str]) -> Dict[str, str]:
+    """
+    Valores publicados antes que não valem mais e são esvaziados para que ninguém leia
+    conteúdo antigo:
+    - partes que não existem mais (o imóvel que abria a parte saiu ou a base encolheu);
+    - a base inteira (<base>), publicada quando a localização ainda não recebia partes.
+      Na primeira publicação com --sharded ela fica vazia: prompts que a referenciam
+      devem passar a ler o <base>_manifest (ou a publicação deve voltar ao modo sem partes).
+    Só entram valores que o sync_state registra como enviados e não vazios.
+    """
+    empty_hash = content_hash("")
+    stale = {}
+    for name, entry in synced_values(sync_state, location_id).items():
+        if name in active or entry.get("hash") == empty_hash:
+            continue
+        match = _SHARD_NAME.search(name)
+        if name in base_names or (match and name[:match.start()] in base_names):
+            stale[name] = ""
+    return stale
+
+def publish_sharded(bases: Dict[str, str], locations: List[dict], max_bytes: Optional[int] = None,
+                    avg_lines: Optional[int] = None, sync_state: Optional[dict] = None, **publish_kwargs) -> List[dict]:
+    """
+    Publica cada base dividida em partes. Só as partes cujo hash mudou entram na fila
+    (controle do sync_state) e são enviadas em paralelo via publish_to_locations, com até
+    SHARD_PER_LOCATION_CONCURRENCY envios simultâneos por localização.
+    Os manifests (e o esvaziamento das partes que sobraram e da base inteira publicada
+    sem partes; veja _stale_shards) só são enviados depois que todas as partes foram
+    publicadas, para que um manifest nunca aponte para partes desatualizadas.
+    Retorna os resultados das duas fases.
+    """
+    sync_state = load_sync_state() if sync_state is None else sync_state
+    publish_kwargs.setdefault("per_location_concurrency", SHARD_PER_LOCATION_CONCURRENCY)
+    publish_kwargs.setdefault("per_location_interval", SHARD_PER_LOCATION_INTERVAL)
+    shards: Dict[str, str] = {}
+    manifests: Dict[str, str] = {}
+    for base_name, content in bases.items():
+        sharded = shard_knowledge_base(base_name, content, max_bytes, avg_lines)
+        shards.update(sharded["shards"])
+        manifests.update(sharded["manifest"])
+        print(f">>> [SHARDS] '{base_name}': {len(sharded['shards'])} parte(s) "
+              f"({len(content.encode('utf-8'))} bytes).")
+
+    results = publish_to_locations(shards, locations, sync_state=sync_state, **publish_kwargs)
+    failed = {r["location_id"] for r in results if not r["ok"]}
+    remaining = [loc for loc in locations if loc["id"] not in failed]
+    if failed:
+        print(f"!!! [SHARDS] {len(failed)} localização(ões) com partes não publicadas; manifest não atualizado nelas.")
+
+    results += publish_to_locations(
+        manifests, remaining, sync_state=sync_state,
+        location_contents=lambda loc: _stale_shards(sync_state, loc["id"], list(bases), shards),
+        **publish_kwargs,
+    )
+    return results
@@ -0,0 +1,118 @@
+# backend/services/knowledge_base.py
+
+import re
+from typing import Dict, Iterable, List, Tuple
+
+# ==============================================================================
+# 1. CATEGORIAS
+# ==============================================================================
+
+# Ordem das categorias nas bases de conhecimento (a mesma do generate_knowledge_bases.js).
+# Cada item: (chave usada no nome do arquivo <chave>.json, rótulo).
+CATEGORY_ORDER: List[Tuple[str, str]] = [
+    ("apartamentos", "Apartamentos"),
+    ("casas", "Casas"),
+    ("sobrados", "Sobrados"),
+    ("geminados", "Geminados"),
+    ("outros", "Outros Tipos de Imóveis"),
+]
+
+def categorize_listing(record: dict) -> str:
+    """
+    Categoria do imóvel com base no campo 'tipologia' (mesmas regras do categorize.js).
+    """
+    tipologia = (record.get("tipologia") or "outros").lower()
+    if "apartamento" in tipologia:
+        return "apartamentos"
+    if "casa" in tipologia:
+        return "casas"
+    if "geminado" in tipologia:
+        return "geminados"
+    if "sobrado" in tipologia:
+        return "sobrados"
+    return "outros"
+
+def categorize_listings(listings: Iterable[dict]) -> Dict[str, List[dict]]:
+    """
+    Agrupa os registros por categoria, preservando a ordem do feed dentro de cada uma.
+    """
+    categories: Dict[str, List[dict]] = {}
+    for record in listings:
+        categories.setdefault(categorize_listing(record), []).append(record)
+    return categories
+
+# ==============================================================================
+# 2. LINHAS DAS BASES
+# ==============================================================================
+
+_ANGLE_BRACKETS = re.compile(r"[<>]")
+
+def generate_summary_line(record: dict) -> str:
+    """
+    Linha da base resumida. Formato: # [ID] - [Título] - [Link]
+    """
+    listing_id = record.get("listingID") or "ID_N/A"
+    title = record.get("title") or "Imóvel sem título"
+    link = _ANGLE_BRACKETS.sub("", record.get("detailViewUrl") or "")
+    return f"# {listing_id} - {title} - {link}"
+
+def generate_complete_line(record: dict) -> str:
+    """
+    Linha da base completa.
+    Formato: # [ID] = [Título] - [Preço] - [Endereço] - [[Características]] - [Link]
+    """
+    listing_id = record.get("listingID") or "ID_N/A"
+    title = record.get("title") or "Imóvel sem título"
+    price = (record.get("listPrice") or {}).get("value") or "Sob consulta"
+    link = _ANGLE_BRACKETS.sub("", record.get("detailViewUrl") or "")
+
+    address_parts = [
+        record.get("neighborhood"),
+        record.get("address"),
+        record.get("streetNumber"),
+        record.get("complement"),
+        record.get("postalCode"),
+    ]
+    full_address = ", ".join(part for part in address_parts if part)
+
+    features_parts = []
+    constructed_area = (record.get("constructedArea") or {}).get("value")
+    if constructed_area:
+        features_parts.append(f"{constructed_area} m²")
+    if record.get("bedrooms"):
+        features_parts.append(f"{record['bedrooms']} quartos")
+    if record.get("suites"):
+        features_parts.append(f"{record['suites']} suítes")
+    if record.get("bathrooms"):
+        features_parts.append(f"{record['bathrooms']} banheiros")
+    garage = (record.get("garage") or {}).get("value")
+    if garage:
+        features_parts.append(f"{garage} vagas")
+    if record.get("features"):
+        features_parts.extend(record["features"])
+    all_features = f"[{'; '.join(features_parts)}]"
+
+    return f"# {listing_id} = {title} - {price} - {full_address} - {all_features} - {link}"
+
+# ==============================================================================
+# 3. BASES COMPLETAS
+# ==============================================================================
+
+def ordered_records(categories: Dict[str, List[dict]]) -> Iterable[dict]:
+    """
+    Percorre os registros na ordem das bases: por categoria (CATEGORY_ORDER) e, dentro
+    de cada uma, na ordem do feed.
+    """
+    for key, _label in CATEGORY_ORDER:
+        yield from categories.get(key, [])
+
+def render_knowledge_bases(categories: Dict[str, List[dict]]) -> Tuple[str, str]:
+    """
+    Gera o conteúdo de (base_resumida, base_completa), idêntico ao do generate_knowledge_bases.js.
+    """
+    summary_lines = []
+    complete_lines = []
+    for record in ordered_records(categories):
+        summary_lines.append(generate_summary_line(record))
+        complete_lines.append(generate_complete_line(record))
+    return "\n".join(summary_lines).strip(), "\n".join(complete_lines).strip()
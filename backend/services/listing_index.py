@@ -0,0 +1,233 @@
+# backend/services/listing_index.py
+
+import sys
+import json
+import bisect
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .knowledge_base import CATEGORY_ORDER, categorize_listing, generate_summary_line, generate_complete_line
+
+# ==============================================================================
+# 1. REGISTROS TIPADOS
+# ==============================================================================
+
+class Listing(NamedTuple):
+    """
+    Registro compacto de um imóvel, com os campos usados nos filtros já convertidos.
+    'record' é o dict original (o mesmo do output.json), usado para renderizar as linhas.
+    """
+    position: int
+    listing_id: Optional[str]
+    category: str
+    neighborhood: Optional[str]
+    price: Optional[float]
+    area: Optional[float]
+    bedrooms: Optional[int]
+    record: dict
+
+def _to_float(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return None
+
+def _to_price(value) -> Optional[float]:
+    """
+    Preço para os filtros. No feed, "0" (ou negativo) significa "sob consulta": fica sem preço.
+    """
+    price = _to_float(value)
+    return price if price is not None and price > 0 else None
+
+def _to_int(value) -> Optional[int]:
+    number = _to_float(value)
+    return int(number) if number is not None else None
+
+def normalize_key(text: Optional[str]) -> str:
+    """
+    Chave de busca sem acentos e sem diferenciar maiúsculas ("Saguaçu" == "saguacu").
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).strip().casefold()
+
+def to_listing(position: int, record: dict) -> Listing:
+    return Listing(
+        position=position,
+        listing_id=record.get("listingID"),
+        category=categorize_listing(record),
+        neighborhood=record.get("neighborhood"),
+        price=_to_price((record.get("listPrice") or {}).get("value")),
+        area=_to_float((record.get("constructedArea") or {}).get("value")),
+        bedrooms=_to_int(record.get("bedrooms")),
+        record=record,
+    )
+
+# ==============================================================================
+# 2. ÍNDICE
+# ==============================================================================
+
+_CATEGORY_RANK = {key: rank for rank, (key, _label) in enumerate(CATEGORY_ORDER)}
+
+class ListingIndex:
+    """
+    Imóveis do feed em memória com índices secundários por categoria, bairro,
+    quartos e preço (lista ordenada, consultada com bisect). Os registros são
+    convertidos uma única vez; as linhas das bases são renderizadas sob demanda e
+    reaproveitadas por todas as visões.
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        self.listings: List[Listing] = [to_listing(position, record) for position, record in enumerate(records)]
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_neighborhood: Dict[str, List[int]] = {}
+        self.by_bedrooms: Dict[int, List[int]] = {}
+        for listing in self.listings:
+            self.by_category.setdefault(listing.category, []).append(listing.position)
+            self.by_neighborhood.setdefault(normalize_key(listing.neighborhood), []).append(listing.position)
+            if listing.bedrooms is not None:
+                self.by_bedrooms.setdefault(listing.bedrooms, []).append(listing.position)
+
+        priced = sorted((listing.price, listing.position) for listing in self.listings if listing.price is not None)
+        self._prices = [price for price, _position in priced]
+        self._price_positions = [position for _price, position in priced]
+
+        # Ordem das bases: categoria (CATEGORY_ORDER) e, dentro dela, a ordem do feed.
+        self._base_order = {
+            listing.position: (_CATEGORY_RANK.get(listing.category, len(_CATEGORY_RANK)), listing.position)
+            for listing in self.listings
+        }
+        self._summary_lines: Dict[int, str] = {}
+        self._complete_lines: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def categories(self) -> Dict[str, List[dict]]:
+        """
+        Mesmo resultado de knowledge_base.categorize_listings, a partir do índice.
+        """
+        return {category: [self.listings[p].record for p in positions] for category, positions in self.by_category.items()}
+
+    def neighborhoods(self) -> List[str]:
+        names = {}
+        for listing in self.listings:
+            if listing.neighborhood:
+                names.setdefault(normalize_key(listing.neighborhood), listing.neighborhood)
+        return sorted(names.values(), key=normalize_key)
+
+    # --------------------------------------------------------------------------
+    # Consultas
+    # --------------------------------------------------------------------------
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> List[int]:
+        lo = 0 if min_price is None else bisect.bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect.bisect_right(self._prices, max_price)
+        return self._price_positions[lo:hi]
+
+    def query(self, category: Optional[str] = None, neighborhood: Optional[str] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              bedrooms: Optional[int] = None, min_bedrooms: Optional[int] = None) -> List[Listing]:
+        """
+        Imóveis que atendem a todos os filtros informados, na ordem das bases.
+        Cada filtro usa o seu índice; a interseção começa pelo menor conjunto.
+        """
+        candidates: List[List[int]] = []
+        if category is not None:
+            candidates.append(self.by_category.get(category, []))
+        if neighborhood is not None:
+            candidates.append(self.by_neighborhood.get(normalize_key(neighborhood), []))
+        if bedrooms is not None:
+            candidates.append(self.by_bedrooms.get(bedrooms, []))
+        if min_bedrooms is not None:
+            candidates.append([p for count, positions in self.by_bedrooms.items() if count >= min_bedrooms for p in positions])
+        if min_price is not None or max_price is not None:
+            candidates.append(self._price_range(min_price, max_price))
+
+        if not candidates:
+            positions = range(len(self.listings))
+        else:
+            candidates.sort(key=len)
+            selected = set(candidates[0])
+            for other in candidates[1:]:
+                if not selected:
+                    break
+                selected.intersection_update(other)
+            positions = selected
+        return [self.listings[p] for p in sorted(positions, key=self._base_order.__getitem__)]
+
+    # --------------------------------------------------------------------------
+    # Renderização
+    # --------------------------------------------------------------------------
+
+    def summary_line(self, listing: Listing) -> str:
+        line = self._summary_lines.get(listing.position)
+        if line is None:
+            line = self._summary_lines[listing.position] = generate_summary_line(listing.record)
+        return line
+
+    def complete_line(self, listing: Listing) -> str:
+        line = self._complete_lines.get(listing.position)
+        if line is None:
+            line = self._complete_lines[listing.position] = generate_complete_line(listing.record)
+        return line
+
+    def render_view(self, listings: Iterable[Listing]) -> Tuple[str, str]:
+        """
+        (base_resumida, base_completa) contendo apenas os imóveis informados.
+        """
+        listings = list(listings)
+        return (
+            "\n".join(self.summary_line(listing) for listing in listings).strip(),
+            "\n".join(self.complete_line(listing) for listing in listings).strip(),
+        )
+
+# ==============================================================================
+# 3. FILTROS EM TEXTO
+# ==============================================================================
+
+_FILTER_TYPES = {
+    "category": str,
+    "neighborhood": str,
+    "min_price": float,
+    "max_price": float,
+    "bedrooms": int,
+    "min_bedrooms": int,
+}
+
+def parse_filters(spec: str) -> dict:
+    """
+    Converte "neighborhood=América;max_price=800000" nos argumentos de ListingIndex.query.
+    Lança ValueError para filtros desconhecidos ou valores inválidos.
+    """
+    filters = {}
+    for part in filter(None, (item.strip() for item in spec.split(";"))):
+        key, sep, value = part.partition("=")
+        key = key.strip()
+        if not sep or key not in _FILTER_TYPES:
+            raise ValueError(f"Filtro inválido: '{part}'. Use: {', '.join(_FILTER_TYPES)}.")
+        filters[key] = _FILTER_TYPES[key](value.strip())
+    return filters
+
+# ==============================================================================
+# 4. EXECUÇÃO DIRETA
+# ==============================================================================
+
+if __name__ == "__main__":
+    # Uso: python -m backend.services.listing_index output.json "neighborhood=América;max_price=800000" [prefixo]
+    # Grava <prefixo>_resumida.md e <prefixo>_completa.md com os imóveis filtrados.
+    if len(sys.argv) < 3:
+        print("Uso: python -m backend.services.listing_index <output.json> <filtros> [prefixo]")
+        sys.exit(2)
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        index = ListingIndex(json.load(f))
+    selected = index.query(**parse_filters(sys.argv[2]))
+    prefix = sys.argv[3] if len(sys.argv) > 3 else "view"
+    resumida, completa = index.render_view(selected)
+    for suffix, content in (("resumida", resumida), ("completa", completa)):
+        with open(f"{prefix}_{suffix}.md", "w", encoding="utf-8") as f:
+            f.write(content)
+    print(f"{len(selected)} de {len(index)} imóveis selecionados. Arquivos '{prefix}_resumida.md' e '{prefix}_completa.md' gerados.")
@@ -0,0 +1,355 @@
+# backend/services/metrics.py
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, Optional, Tuple
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Log estruturado (uma linha JSON por evento). "-" envia para stderr; vazio desativa.
+METRICS_LOG_FILE = os.getenv("METRICS_LOG_FILE", os.path.join(os.path.dirname(__file__), "..", "metrics.jsonl"))
+# Rotação do log: ao passar de METRICS_LOG_MAX_BYTES, o arquivo vira metrics.jsonl.1 (o .1 vira .2,
+# e assim por diante) e só METRICS_LOG_BACKUPS arquivos antigos são mantidos. 0 desativa a rotação.
+METRICS_LOG_MAX_BYTES = int(os.getenv("METRICS_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+METRICS_LOG_BACKUPS = int(os.getenv("METRICS_LOG_BACKUPS", "3"))
+# Arquivo no formato de exposição de texto do Prometheus (node_exporter textfile collector). Vazio desativa.
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE", os.path.join(os.path.dirname(__file__), "..", "metrics.prom"))
+
+METRIC_PREFIX = "jardins_"
+# Limites (segundos) dos buckets dos histogramas de latência.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Amostras recentes guardadas por série para o cálculo de p50/p99 no resumo.
+_SAMPLES_PER_SERIES = 2048
+
+METRIC_HELP = {
+    "http_requests_total": "Tentativas de requisição HTTP por método, rota e status.",
+    "http_request_duration_seconds": "Duração de cada tentativa de requisição HTTP.",
+    "http_request_bytes_total": "Bytes enviados no corpo das requisições HTTP.",
+    "http_response_bytes_total": "Bytes recebidos no corpo das respostas HTTP.",
+    "http_retries_total": "Retentativas HTTP por rota e motivo.",
+    "pipeline_stage_duration_seconds": "Duração de cada etapa do pipeline.",
+    "scheduler_job_duration_seconds": "Duração de cada execução das tarefas do agendador.",
+    "scheduler_job_failures_total": "Execuções de tarefas do agendador que falharam.",
+    "scheduler_job_skipped_total": "Disparos de tarefas ignorados por sobreposição.",
+}
+
+# Identificador desta execução do processo, presente em todos os eventos do log.
+RUN_ID = uuid.uuid4().hex[:12]
+
+# ==============================================================================
+# 2. REGISTRO DAS MÉTRICAS
+# ==============================================================================
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class _Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=_SAMPLES_PER_SERIES)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(LATENCY_BUCKETS, value)
+        if index < len(self.bucket_counts):
+            self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+_histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name: str, value: float, **labels) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram()
+        histogram.observe(value)
+
+def samples(name: str, **labels) -> list:
+    """
+    Amostras recentes de um histograma, somando as séries cujos rótulos contêm 'labels'.
+    """
+    wanted = set(_labels(labels))
+    with _lock:
+        return [value for (metric, series), h in _histograms.items()
+                if metric == name and wanted <= set(series) for value in h.samples]
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+# ==============================================================================
+# 3. LOG ESTRUTURADO E SPANS
+# ==============================================================================
+
+_log_lock = threading.Lock()
+_log_stream = None
+_local = threading.local()
+
+def _open_log():
+    global _log_stream
+    if _log_stream is None and METRICS_LOG_FILE:
+        _log_stream = sys.stderr if METRICS_LOG_FILE == "-" else open(METRICS_LOG_FILE, "a", encoding="utf-8")
+    return _log_stream
+
+def _rotate_log() -> None:
+    """
+    Renomeia o log atual para .1 (descartando o mais antigo) e reabre um arquivo vazio.
+    Chamado com _log_lock adquirido.
+    """
+    global _log_stream
+    _log_stream.close()
+    _log_stream = None
+    for index in range(METRICS_LOG_BACKUPS - 1, 0, -1):
+        older = f"{METRICS_LOG_FILE}.{index}"
+        if os.path.exists(older):
+            os.replace(older, f"{METRICS_LOG_FILE}.{index + 1}")
+    if METRICS_LOG_BACKUPS > 0:
+        os.replace(METRICS_LOG_FILE, f"{METRICS_LOG_FILE}.1")
+    else:
+        os.remove(METRICS_LOG_FILE)
+
+def emit(event: str, **fields) -> None:
+    """
+    Grava um evento como uma linha JSON (com horário, RUN_ID e o span atual da thread).
+    """
+    stack = getattr(_local, "spans", None)
+    record = {"ts": round(time.time(), 3), "run_id": RUN_ID, "event": event}
+    if stack:
+        record["parent_id"] = stack[-1]
+    record.update(fields)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock:
+        stream = _open_log()
+        if stream is not None:
+            stream.write(line + "\n")
+            stream.flush()
+            if stream is not sys.stderr and METRICS_LOG_MAX_BYTES and stream.tell() >= METRICS_LOG_MAX_BYTES:
+                try:
+                    _rotate_log()
+                except OSError as e:
+                    print(f"!!! [METRICS] Não foi possível rotacionar '{METRICS_LOG_FILE}': {e}")
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[dict]:
+    """
+    Mede um trecho de código e grava um evento 'span' ao final, com duração e status.
+    O dict retornado pode receber atributos extras durante a execução. Spans abertos
+    dentro dele (na mesma thread) registram este como 'parent_id'.
+    """
+    span_id = uuid.uuid4().hex[:16]
+    stack = getattr(_local, "spans", None)
+    if stack is None:
+        stack = _local.spans = []
+    started = time.perf_counter()
+    status = "ok"
+    stack.append(span_id)
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        stack.pop()
+        duration = time.perf_counter() - started
+        attrs["duration_ms"] = round(duration * 1000, 3)
+        emit("span", name=name, span_id=span_id, status=status, **attrs)
+
+# ==============================================================================
+# 4. HTTP
+# ==============================================================================
+
+# IDs nos caminhos da API (/locations/<id>/customValues/<id>) viram ':id' para que
+# a cardinalidade das métricas não cresça com o número de localizações.
+_ID_SEGMENT = re.compile(r"/(locations|customValues)/[^/?]+")
+
+def route_for(url: str, route: Optional[str] = None) -> str:
+    if route:
+        return route
+    path = re.sub(r"^https?://[^/]+", "", url).split("?", 1)[0]
+    return _ID_SEGMENT.sub(r"/\1/:id", path) or "/"
+
+def record_http(method: str, url: str, status, duration: float, request_bytes: int = 0,
+                response_bytes: int = 0, attempt: int = 0, route: Optional[str] = None, **fields) -> None:
+    """
+    Registra uma tentativa de requisição HTTP (status "error" para falhas de conexão).
+    """
+    route = route_for(url, route)
+    method = method.upper()
+    inc("http_requests_total", method=method, route=route, status=status)
+    observe("http_request_duration_seconds", duration, method=method, route=route)
+    if request_bytes:
+        inc("http_request_bytes_total", request_bytes, method=method, route=route)
+    if response_bytes:
+        inc("http_response_bytes_total", response_bytes, method=method, route=route)
+    emit("http", method=method, route=route, status=status, duration_ms=round(duration * 1000, 3),
+         request_bytes=request_bytes, response_bytes=response_bytes, attempt=attempt, **fields)
+
+def record_retry(url: str, reason: str, route: Optional[str] = None) -> None:
+    inc("http_retries_total", route=route_for(url, route), reason=reason)
+
+# ==============================================================================
+# 5. EXPOSIÇÃO (PROMETHEUS) E RESUMO
+# ==============================================================================
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in items)
+    return "{" + ",".join(escaped) + "}"
+
+def render_prometheus() -> str:
+    """
+    Todas as métricas no formato de exposição de texto do Prometheus (versão 0.0.4).
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items(), key=lambda item: item[0])
+        histograms = [(key, (list(h.bucket_counts), h.count, h.sum)) for key, h in histograms]
+
+    lines = []
+    declared = set()
+
+    def declare(name: str, kind: str) -> None:
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+    for (name, labels), value in counters:
+        declare(name, "counter")
+        lines.append(f"{METRIC_PREFIX}{name}{_format_labels(labels)} {value:g}")
+
+    for (name, labels), (bucket_counts, count, total) in histograms:
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, bucket_counts):
+            cumulative += bucket_count
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+        lines.append(f"{METRIC_PREFIX}{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {count}")
+        lines.append(f"{METRIC_PREFIX}{name}_sum{_format_labels(labels)} {total:.6f}")
+        lines.append(f"{METRIC_PREFIX}{name}_count{_format_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path: Optional[str] = None) -> Optional[str]:
+    """
+    Grava a exposição em arquivo (de forma atômica, para o coletor nunca ler um arquivo pela metade).
+    """
+    path = METRICS_PROM_FILE if path is None else path
+    if not path:
+        return None
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp_path, path)
+    return path
+
+def latency_breakdown() -> list:
+    """
+    Uma linha por série de latência: etapas do pipeline, tarefas do agendador e rotas HTTP.
+    """
+    with _lock:
+        rows = [
+            {
+                "metric": name,
+                "labels": dict(labels),
+                "count": h.count,
+                "total": h.sum,
+                "p50": h.quantile(0.5),
+                "p99": h.quantile(0.99),
+            }
+            for (name, labels), h in _histograms.items()
+        ]
+    return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+def print_breakdown() -> None:
+    rows = latency_breakdown()
+    if not rows:
+        return
+    grand_total = sum(row["total"] for row in rows if row["metric"] == "pipeline_stage_duration_seconds")
+    print("\n--- [METRICS] LATÊNCIA POR ETAPA ---")
+    print(f"    {'série':<52} {'n':>5} {'total':>9} {'p50':>8} {'p99':>8}")
+    for row in rows:
+        labels = row["labels"]
+        if row["metric"] == "http_request_duration_seconds":
+            label = f"http {labels.get('method')} {labels.get('route')}"
+        elif row["metric"] == "pipeline_stage_duration_seconds":
+            label = f"etapa {labels.get('stage')}"
+        else:
+            label = f"{row['metric']} {' '.join(labels.values())}"
+        print(f"    {label[:52]:<52} {row['count']:>5} {row['total']:8.3f}s {row['p50']:7.3f}s {row['p99']:7.3f}s")
+    if grand_total:
+        print(f"    Tempo total nas etapas do pipeline: {grand_total:.3f}s")
+    emit("breakdown", series=rows)
+
+def finish_run() -> None:
+    """
+    Fecha uma execução: imprime o resumo de latência e grava o arquivo do Prometheus.
+    """
+    print_breakdown()
+    try:
+        path = write_prometheus()
+        if path:
+            print(f">>> [METRICS] Métricas gravadas em '{path}'.")
+    except OSError as e:
+        print(f"!!! [METRICS] Não foi possível gravar o arquivo de métricas: {e}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args):
+        pass
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Expõe GET /metrics em uma thread de fundo (usado pelo agendador residente).
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f">>> [METRICS] Endpoint Prometheus em http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,219 @@
+# backend/services/pipeline.py
+
+import os
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+from . import metrics
+from .feed_ingest import open_feed, iter_listings_from_stream, write_listings_json
+from .feed_cache import fetch_feed
+from .listing_index import ListingIndex
+from .description_normalizer import DescriptionNormalizer
+from .snapshot import Snapshot, diff_snapshots, list_snapshots, save_snapshot
+from .kb_builder import IncrementalKnowledgeBaseBuilder, changeset_has_changes
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Raiz do projeto: onde os scripts Node.js gravavam output.json, <categoria>.json e as bases .md.
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BASE_COMPLETA_FILENAME = "base_completa.md"
+BASE_RESUMIDA_FILENAME = "base_resumida.md"
+OUTPUT_JSON_FILENAME = "output.json"
+
+# Assinatura da etapa de publicação: recebe (base_resumida, base_completa) e retorna sucesso.
+PublishFn = Callable[[str, str], bool]
+
+# ==============================================================================
+# 2. MEDIÇÃO DAS ETAPAS
+# ==============================================================================
+
+class StageFailed(Exception):
+    """Falha em uma etapa do pipeline (a mensagem já foi exibida)."""
+
+class Pipeline:
+    """
+    Executa as etapas fetch -> parse -> normalize -> categorize -> snapshot -> render -> publish em memória,
+    registrando o tempo de cada uma.
+    A leitura do XML é incremental, mas o pipeline guarda todos os registros: o índice, o
+    snapshot e as bases precisam do feed inteiro. A memória cresce com o número de imóveis
+    (não com o tamanho do XML); só 'python -m backend.services.feed_ingest' grava os
+    registros sem mantê-los em memória.
+    """
+
+    def __init__(self, debug: bool = False, output_dir: str = ROOT_DIR, force_publish: bool = False,
+                 kb_state_file: Optional[str] = None, snapshot_dir: Optional[str] = None,
+                 description_cache_file: Optional[str] = None):
+        self.debug = debug
+        self.output_dir = output_dir
+        self.force_publish = force_publish
+        self.kb_state_file = kb_state_file
+        self.snapshot_dir = snapshot_dir
+        self.description_cache_file = description_cache_file
+        self.timings: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        print(f"\n--- [PIPELINE] ETAPA: {name} ---")
+        started = time.perf_counter()
+        try:
+            with metrics.span("pipeline.stage", stage=name):
+                yield
+        except StageFailed:
+            raise
+        except Exception as e:
+            print(f"!!! [PIPELINE] FALHA na etapa '{name}': {e}")
+            raise StageFailed(name) from e
+        finally:
+            seconds = time.perf_counter() - started
+            self.timings.append((name, seconds))
+            metrics.observe("pipeline_stage_duration_seconds", seconds, stage=name)
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.output_dir, filename)
+
+    def print_timings(self) -> None:
+        total = sum(seconds for _name, seconds in self.timings)
+        print("\n--- [PIPELINE] TEMPO POR ETAPA ---")
+        for name, seconds in self.timings:
+            share = (seconds / total * 100) if total else 0
+            print(f"    {name:<12} {seconds:8.3f}s  {share:5.1f}%")
+        print(f"    {'total':<12} {total:8.3f}s")
+
+    def _write_debug_files(self, listings: List[dict], categories: dict) -> None:
+        """
+        Grava os arquivos intermediários (output.json e <categoria>.json), como os scripts
+        Node.js faziam. Só é usado no modo debug.
+        """
+        write_listings_json(listings, self.path(OUTPUT_JSON_FILENAME))
+        for category, records in categories.items():
+            with open(self.path(f"{category}.json"), "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+        print(f"    [DEBUG] Arquivos intermediários gravados em '{self.output_dir}'.")
+
+    # ==========================================================================
+    # 3. EXECUÇÃO
+    # ==========================================================================
+
+    def run(self, source=None, publish: Optional[PublishFn] = None) -> Optional[dict]:
+        """
+        Executa o pipeline completo. Retorna um dict com os registros, as categorias, o índice, as
+        bases geradas e o changeset (e 'published' se houver etapa de publicação), ou None
+        em caso de falha. Se o feed não mudou na origem, retorna {"feed_unchanged": True}
+        sem executar as demais etapas. Sem alterações no changeset, a publicação é pulada, a menos
+        que 'force_publish' esteja ativo.
+        """
+        try:
+            builder = IncrementalKnowledgeBaseBuilder(self.kb_state_file)
+
+            with self.stage("fetch"):
+                # URLs passam pelo cache local com requisição condicional; arquivos locais
+                # e fluxos já abertos são lidos diretamente.
+                feed_sha256 = None
+                if source is None or (isinstance(source, str) and source.startswith(("http://", "https://"))):
+                    fetched = fetch_feed(source)
+                    source = fetched["path"]
+                    feed_sha256 = fetched["sha256"]
+
+            # Compara com o último feed processado com sucesso (e não apenas com o último
+            # baixado), para que uma publicação que falhou seja repetida na execução seguinte.
+            if feed_sha256 and feed_sha256 == builder.feed_sha256 and not self.force_publish:
+                print("\n>>> [PIPELINE] Feed inalterado desde a última execução. Nada a fazer.")
+                # Execução sem alterações é um sucesso: fica registrada nas métricas, não no código de saída.
+                metrics.inc("pipeline_feed_unchanged_total")
+                metrics.emit("feed_unchanged", sha256=feed_sha256)
+                return {"feed_unchanged": True}
+
+            with self.stage("parse"):
+                # Lista materializada de propósito: as etapas seguintes percorrem todos os registros.
+                with open_feed(source) as stream:
+                    listings = list(iter_listings_from_stream(stream))
+                print(f">>> [PIPELINE] {len(listings)} imóvel(is) lido(s) do feed.")
+
+            with self.stage("normalize"):
+                # Descrições sem HTML/entidades e características extraídas; só descrições
+                # novas ou editadas são processadas (cache pelo hash da descrição).
+                normalizer = DescriptionNormalizer(self.description_cache_file)
+                normalizer.normalize_all(listings)
+                normalizer.save()
+                print(f">>> [PIPELINE] Descrições: {normalizer.misses} processada(s), {normalizer.hits} em cache.")
+
+            with self.stage("categorize"):
+                # O índice converte cada registro uma única vez e serve às visões filtradas
+                # (ListingIndex.query / render_view) sem reprocessar o feed.
+                index = ListingIndex(listings)
+                categories = index.categories()
+                for category, records in categories.items():
+                    print(f"    {category}: {len(records)} registro(s)")
+                if self.debug:
+                    self._write_debug_files(listings, categories)
+
+            with self.stage("snapshot"):
+                # Histórico colunar de cada leitura do feed; o diff com a anterior lê só
+                # IDs, preços e hashes (sem decodificar as descrições).
+                previous = list_snapshots(self.snapshot_dir)[-1:]
+                snapshot_path = save_snapshot(index.listings, self.snapshot_dir)
+                snapshot_diff = None
+                if previous:
+                    with Snapshot(previous[0]) as old, Snapshot(snapshot_path) as new:
+                        snapshot_diff = diff_snapshots(old, new)
+                    print(f">>> [PIPELINE] Snapshot: {len(snapshot_diff['added'])} novo(s), "
+                          f"{len(snapshot_diff['removed'])} removido(s), {len(snapshot_diff['changed'])} alterado(s), "
+                          f"{len(snapshot_diff['price_changes'])} mudança(s) de preço.")
+
+            with self.stage("render"):
+                # Só imóveis novos ou alterados são renderizados; o restante vem do estado anterior.
+                built = builder.build(categories)
+                base_resumida, base_completa = built["base_resumida"], built["base_completa"]
+                changeset = built["changeset"]
+                has_changes = changeset_has_changes(changeset)
+
+                # As bases .md são o produto final e continuam sendo gravadas em disco.
+                for filename, content in ((BASE_RESUMIDA_FILENAME, base_resumida), (BASE_COMPLETA_FILENAME, base_completa)):
+                    if has_changes or not os.path.exists(self.path(filename)):
+                        with open(self.path(filename), "w", encoding="utf-8") as f:
+                            f.write(content)
+                print(f">>> [PIPELINE] Bases geradas: resumida ({len(base_resumida)} caracteres), "
+                      f"completa ({len(base_completa)} caracteres).")
+                print(f"    Renderizados: {builder.rendered} | Reaproveitados: {builder.reused} | "
+                      f"Novos: {len(changeset['added'])} | Alterados: {len(changeset['changed'])} | "
+                      f"Removidos: {len(changeset['removed'])}{' | Ordem alterada' if changeset['reordered'] else ''}")
+
+            result = {
+                "listings": listings,
+                "categories": categories,
+                "index": index,
+                "snapshot": snapshot_path,
+                "snapshot_diff": snapshot_diff,
+                "base_resumida": base_resumida,
+                "base_completa": base_completa,
+                "changeset": changeset,
+            }
+
+            if publish is not None:
+                if not has_changes and not self.force_publish:
+                    print("\n>>> [PIPELINE] Nenhuma alteração nos imóveis desde a última execução. Publicação ignorada.")
+                    result["published"] = False
+                else:
+                    with self.stage("publish"):
+                        result["published"] = publish(base_resumida, base_completa)
+                    if not result["published"]:
+                        return None
+
+            # O estado só avança depois de uma publicação bem-sucedida (ou se não há publicação).
+            builder.save(feed_sha256)
+            return result
+        except StageFailed:
+            return None
+        finally:
+            self.print_timings()
+
+def run_pipeline(source=None, publish: Optional[PublishFn] = None, debug: bool = False,
+                 output_dir: str = ROOT_DIR, force_publish: bool = False) -> Optional[dict]:
+    """
+    Atalho para Pipeline(...).run(source, publish).
+    """
+    return Pipeline(debug=debug, output_dir=output_dir, force_publish=force_publish).run(source, publish)
@@ -0,0 +1,151 @@
+# backend/services/scheduler.py
+
+import time
+import random
+import signal
+import threading
+from typing import Callable, Dict, List, Optional
+
+from . import metrics
+
+# ==============================================================================
+# 1. TAREFAS PERIÓDICAS
+# ==============================================================================
+
+class PeriodicJob:
+    """
+    Tarefa executada a cada 'interval' segundos, com um atraso aleatório extra de até
+    'jitter' segundos (evita que várias instâncias batam na API ao mesmo tempo).
+    O intervalo conta a partir do início da execução anterior. Uma nova execução nunca
+    começa enquanto a anterior ainda está rodando: o disparo é pulado e reagendado.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Optional[bool]], interval: float,
+                 jitter: float = 0.0, run_at_start: bool = True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = time.monotonic() if run_at_start else self._next_after(time.monotonic())
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration: Optional[float] = None
+        self._running = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _next_after(self, started: float) -> float:
+        return started + self.interval + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    @property
+    def running(self) -> bool:
+        return self._running.locked()
+
+    def trigger(self, now: float) -> bool:
+        """
+        Inicia a tarefa em uma thread própria, se ela não estiver em execução.
+        Retorna False quando o disparo foi pulado por sobreposição.
+        """
+        self.next_run = self._next_after(now)
+        if not self._running.acquire(blocking=False):
+            self.skipped += 1
+            metrics.inc("scheduler_job_skipped_total", job=self.name)
+            print(f"--- [SCHEDULER] '{self.name}' ainda em execução. Disparo ignorado.")
+            return False
+        # Thread daemon: se o encerramento estourar o prazo, o processo não fica preso nela.
+        self._thread = threading.Thread(target=self._run, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            print(f"\n>>> [SCHEDULER] Iniciando '{self.name}' ({time.strftime('%Y-%m-%d %H:%M:%S')}).")
+            with metrics.span("scheduler.job", job=self.name) as attrs:
+                ok = self.func()
+                attrs["ok"] = ok is not False
+            if ok is False:
+                self.failures += 1
+                metrics.inc("scheduler_job_failures_total", job=self.name)
+                print(f"!!! [SCHEDULER] '{self.name}' terminou com falha.")
+        except Exception as e:
+            self.failures += 1
+            metrics.inc("scheduler_job_failures_total", job=self.name)
+            print(f"!!! [SCHEDULER] Erro inesperado em '{self.name}': {e}")
+        finally:
+            self.runs += 1
+            self.last_duration = time.perf_counter() - started
+            metrics.observe("scheduler_job_duration_seconds", self.last_duration, job=self.name)
+            try:
+                metrics.write_prometheus()
+            except OSError as e:
+                print(f"!!! [SCHEDULER] Não foi possível gravar o arquivo de métricas: {e}")
+            print(f">>> [SCHEDULER] '{self.name}' concluída em {self.last_duration:.2f}s.")
+            self._running.release()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Aguarda a execução em andamento (se houver). Retorna True se ela terminou.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+# ==============================================================================
+# 2. AGENDADOR
+# ==============================================================================
+
+class Scheduler:
+    """
+    Laço residente que dispara as tarefas periódicas. Sinais SIGTERM/SIGINT pedem o
+    encerramento: nenhuma tarefa nova é iniciada e as que estão rodando podem terminar
+    (até 'shutdown_timeout' segundos).
+    """
+
+    def __init__(self, jobs: List[PeriodicJob], shutdown_timeout: float = 120.0):
+        self.jobs: Dict[str, PeriodicJob] = {job.name: job for job in jobs}
+        self.shutdown_timeout = shutdown_timeout
+        self._stop = threading.Event()
+
+    def stop(self, *_args) -> None:
+        if not self._stop.is_set():
+            print("\n>>> [SCHEDULER] Encerramento solicitado. Aguardando as tarefas em andamento...")
+        self._stop.set()
+
+    def install_signal_handlers(self) -> None:
+        """
+        Registra o encerramento limpo para SIGTERM (docker stop) e SIGINT (Ctrl+C).
+        Precisa ser chamado na thread principal.
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run(self) -> None:
+        """
+        Bloqueia até stop() ser chamado; depois espera as tarefas em andamento.
+        """
+        names = ", ".join(f"{job.name} ({job.interval:g}s ±{job.jitter:g}s)" for job in self.jobs.values())
+        print(f">>> [SCHEDULER] Tarefas: {names}")
+
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for job in self.jobs.values():
+                if job.next_run <= now:
+                    job.trigger(now)
+            next_due = min(job.next_run for job in self.jobs.values())
+            self._stop.wait(max(0.0, next_due - time.monotonic()))
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for job in self.jobs.values():
+            if not job.join(max(0.0, deadline - time.monotonic())):
+                print(f"!!! [SCHEDULER] '{job.name}' não terminou dentro de {self.shutdown_timeout:g}s.")
+        self.print_summary()
+
+    def print_summary(self) -> None:
+        print("\n--- [SCHEDULER] RESUMO ---")
+        for job in self.jobs.values():
+            last = f"{job.last_duration:.2f}s" if job.last_duration is not None else "-"
+            print(f"    {job.name:<10} execuções: {job.runs} | falhas: {job.failures} | "
+                  f"puladas (sobreposição): {job.skipped} | última: {last}")
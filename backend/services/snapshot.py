@@ -0,0 +1,347 @@
+# backend/services/snapshot.py
+
+import os
+import sys
+import json
+import mmap
+import time
+import bisect
+import struct
+import hashlib
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from .listing_index import Listing, ListingIndex
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO E FORMATO
+# ==============================================================================
+
+# Um arquivo .snap por leitura do feed; os mais antigos além de SNAPSHOT_KEEP são apagados.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), "..", "snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "30"))
+SNAPSHOT_SUFFIX = ".snap"
+
+# Layout (little-endian):
+#   cabeçalho: MAGIC, versão (u16), nº de imóveis (u32), nº de colunas (u16)
+#   diretório: por coluna -> tamanho do nome (u8), nome, tipo (u8), offset (u64), tamanho (u64)
+#   dados de cada coluna, alinhados em 8 bytes:
+#     F64: n valores double (NaN = ausente)
+#     STR: n flags de nulo (u8), offsets (n+1, u32) e o blob UTF-8
+#     U32: n inteiros (usado pelo índice por listingID: posições ordenadas pelo ID)
+MAGIC = b"JSNP"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIH")
+_COLUMN_ENTRY = struct.Struct("<BQQ")
+KIND_F64, KIND_STR, KIND_U32 = 1, 2, 3
+
+# Colunas gravadas, na ordem do arquivo. 'record' é o registro original sem a descrição e
+# sem o texto limpo dela ('descriptionText'), que ficam em colunas próprias para que nada
+# precise decodificá-los sem necessidade.
+STR_COLUMNS = ("listingID", "title", "category", "neighborhood", "content_hash", "record", "description",
+               "description_text")
+F64_COLUMNS = ("price", "area", "bedrooms")
+ID_INDEX_COLUMN = "id_index"
+
+if sys.byteorder != "little":
+    raise ImportError("O formato de snapshot assume uma plataforma little-endian.")
+
+def _align(offset: int, boundary: int = 8) -> int:
+    return (offset + boundary - 1) // boundary * boundary
+
+def record_content_hash(record: dict) -> str:
+    """
+    Hash do registro completo (inclui a descrição), usado pelo diff para detectar
+    qualquer alteração sem ler a coluna de descrições.
+    """
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# ==============================================================================
+# 2. GRAVAÇÃO
+# ==============================================================================
+
+def _encode_str_column(values: List[Optional[str]]) -> bytes:
+    flags = bytearray(1 if value is None else 0 for value in values)
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        if value is not None:
+            blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    padding = b"\0" * (_align(len(flags), 4) - len(flags))
+    return bytes(flags) + padding + offsets.tobytes() + bytes(blob)
+
+def write_snapshot(path: str, listings: Iterable[Listing]) -> int:
+    """
+    Grava os imóveis (como em ListingIndex.listings) em formato colunar. A gravação é
+    atômica (arquivo temporário + os.replace). Retorna a quantidade de imóveis.
+    """
+    listings = list(listings)
+    nan = float("nan")
+    columns: Dict[str, tuple] = {}
+
+    records_without_description = []
+    for listing in listings:
+        record = dict(listing.record)
+        record.pop("description", None)
+        record.pop("descriptionText", None)
+        records_without_description.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+    str_values = {
+        "listingID": [listing.listing_id for listing in listings],
+        "title": [listing.record.get("title") for listing in listings],
+        "category": [listing.category for listing in listings],
+        "neighborhood": [listing.neighborhood for listing in listings],
+        "content_hash": [record_content_hash(listing.record) for listing in listings],
+        "record": records_without_description,
+        "description": [listing.record.get("description") for listing in listings],
+        "description_text": [listing.record.get("descriptionText") for listing in listings],
+    }
+    for name in STR_COLUMNS:
+        columns[name] = (KIND_STR, _encode_str_column(str_values[name]))
+    for name in F64_COLUMNS:
+        values = array("d", (nan if getattr(listing, name) is None else float(getattr(listing, name)) for listing in listings))
+        columns[name] = (KIND_F64, values.tobytes())
+    # Imóveis sem listingID ficam fora do índice.
+    id_order = sorted((listing_id, position) for position, listing_id in enumerate(str_values["listingID"]) if listing_id)
+    columns[ID_INDEX_COLUMN] = (KIND_U32, array("I", (position for _listing_id, position in id_order)).tobytes())
+
+    directory_size = sum(1 + len(name.encode("utf-8")) + _COLUMN_ENTRY.size for name in columns)
+    offset = _align(_HEADER.size + directory_size)
+    layout = []
+    for name, (kind, data) in columns.items():
+        layout.append((name, kind, offset, data))
+        offset = _align(offset + len(data))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(listings), len(columns)))
+        for name, kind, column_offset, data in layout:
+            encoded = name.encode("utf-8")
+            f.write(bytes([len(encoded)]) + encoded + _COLUMN_ENTRY.pack(kind, column_offset, len(data)))
+        for _name, _kind, column_offset, data in layout:
+            f.write(b"\0" * (column_offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+    return len(listings)
+
+# ==============================================================================
+# 3. LEITURA (MMAP, ACESSO PREGUIÇOSO)
+# ==============================================================================
+
+class _StrColumn:
+    """Coluna de texto: cada valor é decodificado só quando acessado."""
+
+    def __init__(self, buf: memoryview, count: int, views: list):
+        offsets_start = _align(count, 4)
+        self._flags = buf[:count]
+        self._offsets = buf[offsets_start:offsets_start + 4 * (count + 1)].cast("I")
+        self._blob = buf[offsets_start + 4 * (count + 1):]
+        views.extend((self._flags, self._offsets, self._blob))
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        if self._flags[position]:
+            return None
+        return str(self._blob[self._offsets[position]:self._offsets[position + 1]], "utf-8")
+
+class _NumberColumn:
+    """Coluna numérica lida diretamente do mmap (F64 -> float ou None; U32 -> int)."""
+
+    def __init__(self, buf: memoryview, fmt: str, views: list):
+        self._values = buf.cast(fmt)
+        self._nullable = fmt == "d"
+        views.append(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __getitem__(self, position: int):
+        value = self._values[position]
+        if self._nullable and value != value:
+            return None
+        return value
+
+class Snapshot:
+    """
+    Snapshot aberto via mmap. Nada é decodificado na abertura: colunas são lidas
+    sob demanda (column(nome)[i]) e find() usa o índice por listingID (busca binária).
+    Use como context manager, ou chame close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        self._views: list = []
+        self._columns: dict = {}
+
+        magic, version, self.count, column_count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"'{path}' não é um snapshot válido (versão {VERSION}).")
+
+        self._directory: Dict[str, tuple] = {}
+        position = _HEADER.size
+        for _ in range(column_count):
+            name_size = self._mmap[position]
+            name = bytes(self._mmap[position + 1:position + 1 + name_size]).decode("utf-8")
+            position += 1 + name_size
+            kind, offset, size = _COLUMN_ENTRY.unpack_from(self._mmap, position)
+            position += _COLUMN_ENTRY.size
+            self._directory[name] = (kind, offset, size)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._columns.clear()
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+        if not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def column(self, name: str):
+        column = self._columns.get(name)
+        if column is None:
+            kind, offset, size = self._directory[name]
+            buf = self._buffer[offset:offset + size]
+            self._views.append(buf)
+            if kind == KIND_STR:
+                column = _StrColumn(buf, self.count, self._views)
+            else:
+                column = _NumberColumn(buf, "d" if kind == KIND_F64 else "I", self._views)
+            self._columns[name] = column
+        return column
+
+    def find(self, listing_id: str) -> Optional[int]:
+        """
+        Posição do imóvel com o listingID informado, ou None.
+        """
+        ids = self.column("listingID")
+        order = self.column(ID_INDEX_COLUMN)
+        index = bisect.bisect_left(order, listing_id, key=lambda position: ids[position])
+        if index < len(order) and ids[order[index]] == listing_id:
+            return order[index]
+        return None
+
+    def record(self, position: int, with_description: bool = True) -> dict:
+        """
+        Registro original (o mesmo formato do output.json).
+        """
+        record = json.loads(self.column("record")[position])
+        if with_description:
+            record["description"] = self.column("description")[position]
+            # Snapshots gravados antes da normalização das descrições não têm esta coluna.
+            if "description_text" in self._directory:
+                text = self.column("description_text")[position]
+                if text is not None:
+                    record["descriptionText"] = text
+        return record
+
+    def records(self, with_description: bool = True) -> Iterable[dict]:
+        for position in range(self.count):
+            yield self.record(position, with_description)
+
+# ==============================================================================
+# 4. DIFERENÇAS ENTRE SNAPSHOTS
+# ==============================================================================
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> dict:
+    """
+    Compara dois snapshots em O(n) lendo apenas listingID, preço e hash do conteúdo
+    (as descrições não são decodificadas). Retorna:
+    {"added": [ids], "removed": [ids], "changed": [ids], "price_changes": [{id, old, new}]}.
+    'changed' inclui qualquer alteração de conteúdo (inclusive de preço).
+    """
+    old_ids, new_ids = old.column("listingID"), new.column("listingID")
+    old_positions = {old_ids[position]: position for position in range(len(old)) if old_ids[position]}
+
+    old_hashes, new_hashes = old.column("content_hash"), new.column("content_hash")
+    old_prices, new_prices = old.column("price"), new.column("price")
+
+    result = {"added": [], "removed": [], "changed": [], "price_changes": []}
+    seen = set()
+    for position in range(len(new)):
+        listing_id = new_ids[position]
+        if not listing_id or listing_id in seen:
+            continue
+        seen.add(listing_id)
+        old_position = old_positions.get(listing_id)
+        if old_position is None:
+            result["added"].append(listing_id)
+            continue
+        if old_hashes[old_position] != new_hashes[position]:
+            result["changed"].append(listing_id)
+        old_price, new_price = old_prices[old_position], new_prices[position]
+        if old_price != new_price:
+            result["price_changes"].append({"listingID": listing_id, "old": old_price, "new": new_price})
+    result["removed"] = [listing_id for listing_id in old_positions if listing_id not in seen]
+    return result
+
+# ==============================================================================
+# 5. HISTÓRICO
+# ==============================================================================
+
+def list_snapshots(directory: Optional[str] = None) -> List[str]:
+    """
+    Snapshots do diretório, do mais antigo para o mais recente.
+    """
+    directory = directory or SNAPSHOT_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SNAPSHOT_SUFFIX))
+
+def save_snapshot(listings: Iterable[Listing], directory: Optional[str] = None, keep: Optional[int] = None) -> str:
+    """
+    Grava um novo snapshot com nome ordenável por data e remove os que excedem 'keep'.
+    O nome usa a hora UTC: com a hora local, a volta do horário de verão repetiria uma
+    hora e um snapshot mais novo poderia ser ordenado antes de um mais antigo.
+    """
+    directory = directory or SNAPSHOT_DIR
+    keep = SNAPSHOT_KEEP if keep is None else keep
+    os.makedirs(directory, exist_ok=True)
+    now = time.time()
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}-{int(now * 1000) % 1000:03d}{SNAPSHOT_SUFFIX}")
+    write_snapshot(path, listings)
+    for old_path in list_snapshots(directory)[:-keep] if keep > 0 else []:
+        os.remove(old_path)
+    return path
+
+def snapshot_from_records(path: str, records: Iterable[dict]) -> int:
+    """
+    Atalho para gravar um snapshot a partir de registros no formato do output.json.
+    """
+    return write_snapshot(path, ListingIndex(records).listings)
+
+# ==============================================================================
+# 6. EXECUÇÃO DIRETA
+# ==============================================================================
+
+if __name__ == "__main__":
+    # Uso: python -m backend.services.snapshot [antigo.snap novo.snap]
+    # Sem argumentos, compara os dois snapshots mais recentes de SNAPSHOT_DIR.
+    paths = sys.argv[1:3] if len(sys.argv) >= 3 else list_snapshots()[-2:]
+    if len(paths) < 2:
+        print("São necessários dois snapshots para comparar.")
+        sys.exit(2)
+    with Snapshot(paths[0]) as old, Snapshot(paths[1]) as new:
+        diff = diff_snapshots(old, new)
+    print(json.dumps(diff, indent=2, ensure_ascii=False))
@@ -0,0 +1,128 @@
+# backend/services/sync_state.py
+
+import os
+import time
+import hashlib
+from typing import Callable, NamedTuple, Optional
+
+from .ghl_client import _load_json, _save_json, upsert_custom_value
+from .ghl_http import is_transient_status
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Estado local da última sincronização de cada Valor Personalizado.
+# Chave: "<location_id>:<custom_value_name>" -> {hash, value_id, size, synced_at}
+SYNC_STATE_FILE = os.path.join(os.path.dirname(__file__), "..", "sync_state.json")
+
+# ==============================================================================
+# 2. FUNÇÕES AUXILIARES
+# ==============================================================================
+
+def content_hash(content: str) -> str:
+    """
+    Hash SHA-256 do conteúdo, usado para detectar se o valor mudou desde o último envio.
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def _state_key(location_id: str, custom_value_name: str) -> str:
+    return f"{location_id}:{custom_value_name}"
+
+def synced_values(state: dict, location_id: str) -> dict:
+    """
+    Entradas do estado de uma localização, indexadas pelo nome do Valor Personalizado.
+    """
+    prefix = _state_key(location_id, "")
+    return {key[len(prefix):]: entry for key, entry in state.items() if key.startswith(prefix)}
+
+def is_synced(state: dict, location_id: str, custom_value_name: str, content: str) -> bool:
+    """
+    True se o conteúdo já foi enviado (mesmo hash e ID conhecido): sync_custom_value
+    não faria nenhuma chamada de rede.
+    """
+    entry = state.get(_state_key(location_id, custom_value_name)) or {}
+    return entry.get("hash") == content_hash(content) and bool(entry.get("value_id"))
+
+def load_sync_state() -> dict:
+    """
+    Carrega o estado de sincronização do disco (ou um estado vazio).
+    """
+    return _load_json(SYNC_STATE_FILE) or {}
+
+def save_sync_state(state: dict) -> None:
+    _save_json(SYNC_STATE_FILE, state)
+
+def new_sync_stats() -> dict:
+    """
+    Contadores de uma execução, exibidos ao final por print_sync_stats().
+    """
+    return {"pushed": 0, "skipped": 0, "failed": 0, "bytes_sent": 0, "bytes_saved": 0, "requests_saved": 0}
+
+def print_sync_stats(stats: dict) -> None:
+    print(f">>> [SYNC] Enviados: {stats['pushed']} | Sem alteração (pulados): {stats['skipped']} | Falhas: {stats['failed']}")
+    print(f"    Bytes enviados: {stats['bytes_sent']} | Bytes economizados: {stats['bytes_saved']} | "
+          f"Requisições economizadas: {stats['requests_saved']}")
+
+# ==============================================================================
+# 3. SINCRONIZAÇÃO
+# ==============================================================================
+
+class SyncResult(NamedTuple):
+    """
+    Resultado de sync_custom_value. Avaliado como bool, indica o sucesso; 'status' é o
+    retornado por upsert_custom_value (None quando não houve envio ou o erro não foi HTTP).
+    """
+    ok: bool
+    status: Optional[int] = None
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    @property
+    def transient(self) -> bool:
+        """Falha que vale repetir (429, 5xx, falha de rede)."""
+        return not self.ok and is_transient_status(self.status)
+
+def sync_custom_value(state: dict, location_id: str, access_token: str, custom_value_name: str, new_content: str,
+                      force: bool = False, stats: Optional[dict] = None,
+                      token_refresher: Optional[Callable[[Optional[str]], Optional[str]]] = None) -> SyncResult:
+    """
+    Envia o Valor Personalizado somente se o conteúdo mudou desde a última sincronização.
+    - Hash igual ao registrado: nenhuma chamada de rede.
+    - Hash diferente com ID em cache: PUT direto, sem listar os valores da localização.
+    - 'force=True' ignora o estado local (ressincronização completa para corrigir divergências).
+    O 'state' é atualizado em memória; quem chama é responsável por save_sync_state().
+    """
+    stats = stats if stats is not None else new_sync_stats()
+    key = _state_key(location_id, custom_value_name)
+    entry = state.get(key) or {}
+    digest = content_hash(new_content)
+    size = len(new_content.encode("utf-8"))
+
+    if not force and is_synced(state, location_id, custom_value_name, new_content):
+        print(f"--- [SYNC] '{custom_value_name}' ({location_id}) sem alterações. Envio ignorado.")
+        stats["skipped"] += 1
+        stats["bytes_saved"] += size
+        # Economiza a listagem (GET) e o envio (PUT).
+        stats["requests_saved"] += 2
+        return SyncResult(True)
+
+    cached_id = None if force else entry.get("value_id")
+    value_id, status = upsert_custom_value(location_id, access_token, custom_value_name, new_content,
+                                           existing_value_id=cached_id, token_refresher=token_refresher)
+    if value_id is None:
+        stats["failed"] += 1
+        return SyncResult(False, status)
+
+    if cached_id and value_id == cached_id:
+        stats["requests_saved"] += 1
+    stats["pushed"] += 1
+    stats["bytes_sent"] += size
+    state[key] = {
+        "hash": digest,
+        "value_id": value_id,
+        "size": size,
+        "synced_at": int(time.time()),
+    }
+    return SyncResult(True, status)
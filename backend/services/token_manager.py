@@ -0,0 +1,136 @@
+# backend/services/token_manager.py
+
+import os
+import time
+import threading
+from typing import Optional
+
+from . import ghl_client, token_store
+from .ghl_client import _load_json, refresh_agency_token, get_installed_locations, manage_location_tokens
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Margem de segurança (segundos): tokens que expiram dentro desta janela são renovados.
+TOKEN_SAFETY_WINDOW = int(os.getenv("GHL_TOKEN_SAFETY_WINDOW", "600"))
+# Validade (segundos) da lista de localizações instaladas antes de buscá-la novamente.
+LOCATIONS_LIST_TTL = int(os.getenv("GHL_LOCATIONS_LIST_TTL", "86400"))
+
+# Serializa as renovações: várias threads recebendo 401 para a mesma localização
+# resultam em uma única chamada a /oauth/locationToken.
+_refresh_lock = threading.Lock()
+
+# ==============================================================================
+# 2. VALIDADE DOS TOKENS
+# ==============================================================================
+
+def token_is_valid(token_data: Optional[dict], now: Optional[float] = None) -> bool:
+    """
+    Um token é válido se tiver 'access_token', 'expires_in' e 'refreshed_at_unix_timestamp'
+    e não expirar dentro da janela de segurança. Tokens sem esses campos são tratados
+    como expirados.
+    """
+    if not token_data or not token_data.get("access_token"):
+        return False
+    refreshed_at = token_data.get("refreshed_at_unix_timestamp")
+    expires_in = token_data.get("expires_in")
+    if refreshed_at is None or expires_in is None:
+        return False
+    now = time.time() if now is None else now
+    return refreshed_at + int(expires_in) - TOKEN_SAFETY_WINDOW > now
+
+def _location_id(loc: dict) -> Optional[str]:
+    return loc.get("_id") or loc.get("id")
+
+def _find_location(location_id: str) -> Optional[dict]:
+    return token_store.get_location(location_id)
+
+# ==============================================================================
+# 3. GARANTIA DE TOKENS VÁLIDOS
+# ==============================================================================
+
+def ensure_agency_token(force: bool = False) -> bool:
+    """
+    Renova o token da agência somente se ele estiver expirado ou perto de expirar.
+    """
+    if not force and token_is_valid(_load_json(ghl_client.AGENCY_TOKEN_FILE)):
+        print(">>> [TOKENS] Token da agência ainda válido. Refresh ignorado.")
+        return True
+    return refresh_agency_token()
+
+def ensure_tokens(force: bool = False) -> bool:
+    """
+    Garante tokens válidos para a agência e para todas as localizações instaladas,
+    fazendo o mínimo de chamadas OAuth possível:
+    - token da agência: renovado apenas dentro da janela de segurança;
+    - lista de localizações: buscada apenas se ausente ou mais antiga que LOCATIONS_LIST_TTL;
+    - tokens das localizações: renovados apenas os expirados/ausentes.
+    'force=True' renova tudo, como o fluxo completo original.
+    """
+    with _refresh_lock:
+        if not ensure_agency_token(force):
+            return False
+
+        locations_data = token_store.load_locations_data()
+        fetched_at = (locations_data or {}).get("fetched_at_unix_timestamp", 0)
+        if force or not locations_data or "locations" not in locations_data or time.time() - fetched_at > LOCATIONS_LIST_TTL:
+            if not get_installed_locations():
+                return False
+            locations_data = token_store.load_locations_data() or {}
+        else:
+            print(f">>> [TOKENS] Lista de localizações em cache ({len(locations_data['locations'])}) ainda válida.")
+
+        now = time.time()
+        stale = [
+            _location_id(loc) for loc in locations_data.get("locations", [])
+            if _location_id(loc) and (force or not token_is_valid(loc.get("location_specific_token_data"), now))
+        ]
+        if not stale:
+            print(">>> [TOKENS] Todos os tokens de localização ainda são válidos.")
+            return True
+
+        print(f">>> [TOKENS] Renovando {len(stale)} token(s) de localização expirado(s) ou ausente(s).")
+        return manage_location_tokens(location_ids=stale)
+
+def get_location_access_token(location_id: str, force_refresh: bool = False,
+                              stale_token: Optional[str] = None) -> Optional[str]:
+    """
+    Retorna um access_token válido para a localização, renovando apenas ela se necessário.
+    Com 'force_refresh=True' (ex.: após um 401) o token é renovado, a menos que outra
+    thread já o tenha trocado desde 'stale_token'.
+    """
+    loc = _find_location(location_id)
+    token_data = (loc or {}).get("location_specific_token_data") or {}
+    if not force_refresh and token_is_valid(token_data):
+        return token_data["access_token"]
+
+    with _refresh_lock:
+        loc = _find_location(location_id)
+        token_data = (loc or {}).get("location_specific_token_data") or {}
+        current = token_data.get("access_token")
+        if force_refresh and stale_token and current and current != stale_token:
+            return current
+        if not force_refresh and token_is_valid(token_data):
+            return current
+
+        if not loc:
+            print(f"!!! [TOKENS] Location {location_id} não está na lista de localizações instaladas.")
+            return None
+        print(f">>> [TOKENS] Renovando o token da Location {location_id}.")
+        if not ensure_agency_token() or not manage_location_tokens(location_ids=[location_id]):
+            return None
+
+        token_data = ((_find_location(location_id) or {}).get("location_specific_token_data") or {})
+        return token_data.get("access_token")
+
+def location_token_refresher(location_id: str):
+    """
+    Cria o callback usado pelas chamadas à API para renovar o token após um 401.
+    O callback recebe o token recusado; se outra thread já o substituiu, o token
+    atual é reaproveitado sem nova chamada OAuth.
+    """
+    def refresh(failed_token: Optional[str]) -> Optional[str]:
+        return get_location_access_token(location_id, force_refresh=True, stale_token=failed_token)
+
+    return refresh
@@ -0,0 +1,160 @@
+# backend/services/token_store.py
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Optional
+
+# ==============================================================================
+# 1. CONFIGURAÇÃO
+# ==============================================================================
+
+# Banco SQLite com as localizações instaladas e seus tokens.
+# Substitui o installed_locations_data.json, que é importado automaticamente na primeira abertura.
+LOCATIONS_DB_FILE = os.getenv(
+    "GHL_LOCATIONS_DB_FILE",
+    os.path.join(os.path.dirname(__file__), "..", "installed_locations.db"),
+)
+LEGACY_LOCATIONS_JSON_FILE = os.path.join(os.path.dirname(__file__), "..", "installed_locations_data.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locations (
+    location_id TEXT PRIMARY KEY,
+    position    INTEGER NOT NULL,
+    data        TEXT NOT NULL,
+    updated_at  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# ==============================================================================
+# 2. CONEXÃO
+# ==============================================================================
+
+_conn: Optional[sqlite3.Connection] = None
+_conn_path: Optional[str] = None
+_lock = threading.RLock()
+
+def _location_id(loc: dict) -> Optional[str]:
+    return loc.get("_id") or loc.get("id")
+
+def _connection() -> sqlite3.Connection:
+    """
+    Abre (uma vez por caminho) a conexão compartilhada. O modo WAL permite que outros
+    processos leiam enquanto um escreve, sem nunca enxergar um estado parcial.
+    Deve ser chamada com _lock adquirido.
+    """
+    global _conn, _conn_path
+    if _conn is not None and _conn_path == LOCATIONS_DB_FILE:
+        return _conn
+
+    conn = sqlite3.connect(LOCATIONS_DB_FILE, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    _conn, _conn_path = conn, LOCATIONS_DB_FILE
+    _migrate_legacy_json(conn)
+    return conn
+
+def _migrate_legacy_json(conn: sqlite3.Connection) -> None:
+    """
+    Importa o installed_locations_data.json existente se o banco ainda estiver vazio.
+    """
+    if conn.execute("SELECT 1 FROM locations LIMIT 1").fetchone() is not None:
+        return
+    try:
+        with open(LEGACY_LOCATIONS_JSON_FILE, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return
+    if isinstance(legacy, dict) and legacy.get("locations"):
+        _replace_all(conn, legacy)
+        print(f">>> [STORE] {len(legacy['locations'])} localização(ões) importada(s) de '{LEGACY_LOCATIONS_JSON_FILE}'.")
+
+def _replace_all(conn: sqlite3.Connection, data: dict) -> None:
+    now = int(time.time())
+    rows = [
+        (_location_id(loc), position, json.dumps(loc, ensure_ascii=False), now)
+        for position, loc in enumerate(data.get("locations", [])) if _location_id(loc)
+    ]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM locations")
+        conn.executemany("INSERT INTO locations (location_id, position, data, updated_at) VALUES (?, ?, ?, ?)", rows)
+        for key, value in data.items():
+            if key != "locations":
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# ==============================================================================
+# 3. INTERFACE PÚBLICA
+# ==============================================================================
+
+def load_locations_data() -> Optional[dict]:
+    """
+    Equivalente a _load_json(LOCATIONS_DATA_FILE): retorna {"locations": [...], ...metadados}
+    na ordem original, ou None se não houver localizações salvas.
+    """
+    with _lock:
+        conn = _connection()
+        rows = conn.execute("SELECT data FROM locations ORDER BY position").fetchall()
+        meta = conn.execute("SELECT key, value FROM meta").fetchall()
+    if not rows:
+        return None
+    data = {key: json.loads(value) for key, value in meta}
+    data["locations"] = [json.loads(row[0]) for row in rows]
+    return data
+
+def save_locations_data(data: dict) -> None:
+    """
+    Substitui a lista inteira de localizações (e os metadados) em uma única transação.
+    """
+    with _lock:
+        _replace_all(_connection(), data)
+
+def get_location(location_id: str) -> Optional[dict]:
+    """
+    Busca uma localização pelo ID (consulta indexada pela chave primária).
+    """
+    with _lock:
+        row = _connection().execute("SELECT data FROM locations WHERE location_id = ?", (location_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def list_locations() -> List[dict]:
+    data = load_locations_data()
+    return data["locations"] if data else []
+
+def upsert_location(loc: dict) -> None:
+    """
+    Grava uma única localização de forma atômica. Localizações novas vão para o fim da lista.
+    """
+    location_id = _location_id(loc)
+    if not location_id:
+        return
+    with _lock:
+        conn = _connection()
+        conn.execute(
+            "INSERT INTO locations (location_id, position, data, updated_at) "
+            "VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM locations), ?, ?) "
+            "ON CONFLICT(location_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (location_id, json.dumps(loc, ensure_ascii=False), int(time.time())),
+        )
+
+def update_location_token(location_id: str, token_data: dict) -> None:
+    """
+    Atualiza apenas o 'location_specific_token_data' de uma localização já existente.
+    """
+    with _lock:
+        loc = get_location(location_id)
+        if loc is None:
+            return
+        loc["location_specific_token_data"] = token_data
+        upsert_location(loc)
@@ -0,0 +1,31 @@
+# tests/conftest.py
+
+import pytest
+
+def build_record(listing_id, tipologia="Apartamento", price="500000", neighborhood="Centro", bedrooms="2", **fields):
+    """
+    Registro no formato do output.json com os campos usados pelas bases e pelos filtros.
+    """
+    record = {
+        "listingID": listing_id,
+        "title": f"Imóvel {listing_id}",
+        "detailViewUrl": f"https://example.com/imovel/{listing_id}/",
+        "tipologia": tipologia,
+        "description": f"Descrição do imóvel {listing_id}.",
+        "listPrice": {"value": price, "currency": "BRL"},
+        "constructedArea": {"value": "80", "unit": "square metres"},
+        "bedrooms": bedrooms,
+        "bathrooms": "1",
+        "garage": {"value": "1", "type": "Parking Space"},
+        "features": ["BBQ"],
+        "neighborhood": neighborhood,
+        "address": "Rua das Flores",
+        "streetNumber": "10",
+        "postalCode": "89200-000",
+    }
+    record.update(fields)
+    return record
+
+@pytest.fixture
+def make_record():
+    return build_record
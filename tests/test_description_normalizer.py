@@ -0,0 +1,101 @@
+# tests/test_description_normalizer.py
+
+import json
+
+from backend.services import description_normalizer
+from backend.services.description_normalizer import DescriptionNormalizer, clean_description, dedupe_features
+
+FEED_DESCRIPTION = (
+    "Apartamento com 2 quartos&nbsp;no Centro.<br />\n<br />Próximo a tudo &amp; muito iluminado."
+    "\n<br />\n<br /><strong>Características:</strong><br>\n"
+    "\n• &nbsp;Churrasqueira<br>\n• &nbsp;Piso Porcelanato<br>\n•&nbsp;Sistema de alarme.<br>"
+)
+
+# ==============================================================================
+# LIMPEZA
+# ==============================================================================
+
+def test_clean_description_strips_tags_and_splits_bullets():
+    cleaned = clean_description(FEED_DESCRIPTION)
+    assert cleaned["text"] == "Apartamento com 2 quartos no Centro.\nPróximo a tudo & muito iluminado."
+    assert cleaned["bullets"] == ["Churrasqueira", "Piso Porcelanato", "Sistema de alarme."]
+
+def test_clean_description_keeps_escaped_markup_as_text():
+    assert clean_description("Use &lt;b&gt; aqui")["text"] == "Use <b> aqui"
+
+def test_clean_description_of_empty_input():
+    assert clean_description(None) == {"text": "", "bullets": []}
+    assert clean_description("") == {"text": "", "bullets": []}
+
+def test_bullets_before_the_features_header_stay_in_the_text():
+    description = (
+        "Ampla área de lazer:<br>\n• &nbsp;Piscina externa aquecida<br>\n• &nbsp;Salão gourmet para 50 pessoas<br>"
+        "\n<br /><strong>Características:</strong><br>\n• &nbsp;Elevador<br>"
+    )
+    cleaned = clean_description(description)
+    assert cleaned["text"] == "Ampla área de lazer:\n• Piscina externa aquecida\n• Salão gourmet para 50 pessoas"
+    assert cleaned["bullets"] == ["Elevador"]
+
+def test_dashes_outside_the_features_list_stay_in_the_text():
+    cleaned = clean_description("Valor:<br>- entrada facilitada<br>Fim")
+    assert cleaned == {"text": "Valor:\n- entrada facilitada\nFim", "bullets": []}
+
+# ==============================================================================
+# DEDUPLICAÇÃO
+# ==============================================================================
+
+def test_dedupe_matches_english_features_to_portuguese_bullets():
+    bullets = ["Churrasqueira", "Cozinha", "Piscina", "Elevador", "Lavabo", "Sistema de alarme."]
+    features = ["BBQ", "Kitchen", "Pool", "Elevator", "Alarm System"]
+    assert dedupe_features(bullets, features) == ["Lavabo"]
+
+def test_dedupe_ignores_accents_case_and_repeated_bullets():
+    bullets = ["Área de Serviço", "area de servico", "Móveis planejados", "MOVEIS PLANEJADOS"]
+    assert dedupe_features(bullets, ["Maid's Quarters"]) == ["Móveis planejados"]
+
+def test_dedupe_shares_terms_between_alias_groups():
+    assert dedupe_features(["Portaria 24h", "Acesso controlado"], ["Doorman"]) == ["Acesso controlado"]
+    assert dedupe_features(["Portaria 24h"], ["Controlled Access"]) == []
+
+def test_dedupe_without_features():
+    assert dedupe_features(["Lavabo", "", "Lavabo"], None) == ["Lavabo"]
+
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+def test_normalizer_reuses_cached_results(tmp_path, make_record):
+    cache_file = str(tmp_path / "description_cache.json")
+    first = DescriptionNormalizer(cache_file)
+    record = first.normalize(make_record("1", description=FEED_DESCRIPTION, features=["BBQ"]))
+    first.save()
+    assert record["descriptionFeatures"] == ["Piso Porcelanato", "Sistema de alarme."]
+    assert record["description"] == FEED_DESCRIPTION
+    assert (first.misses, first.hits) == (1, 0)
+
+    second = DescriptionNormalizer(cache_file)
+    again = second.normalize(make_record("1", description=FEED_DESCRIPTION, features=["BBQ"]))
+    assert (second.misses, second.hits) == (0, 1)
+    assert again["descriptionText"] == record["descriptionText"]
+
+def test_cache_from_another_version_is_discarded(tmp_path, make_record, monkeypatch):
+    cache_file = tmp_path / "description_cache.json"
+    normalizer = DescriptionNormalizer(str(cache_file))
+    normalizer.normalize(make_record("1", description=FEED_DESCRIPTION))
+    normalizer.save()
+    assert json.loads(cache_file.read_text(encoding="utf-8"))["version"] == description_normalizer.NORMALIZER_VERSION
+
+    monkeypatch.setattr(description_normalizer, "NORMALIZER_VERSION", description_normalizer.NORMALIZER_VERSION + 1)
+    reloaded = DescriptionNormalizer(str(cache_file))
+    reloaded.normalize(make_record("1", description=FEED_DESCRIPTION))
+    assert (reloaded.misses, reloaded.hits) == (1, 0)
+
+def test_save_drops_entries_no_longer_in_the_feed(tmp_path, make_record):
+    cache_file = tmp_path / "description_cache.json"
+    normalizer = DescriptionNormalizer(str(cache_file))
+    normalizer.normalize_all([make_record("1", description="A"), make_record("2", description="B")])
+    normalizer.save()
+    normalizer = DescriptionNormalizer(str(cache_file))
+    normalizer.normalize(make_record("1", description="A"))
+    normalizer.save()
+    assert len(json.loads(cache_file.read_text(encoding="utf-8"))["entries"]) == 1
@@ -0,0 +1,90 @@
+# tests/test_feed_cache.py
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend.services import feed_cache
+
+FEED = b'<?xml version="1.0" encoding="UTF-8"?><ListingDataFeed><Listings/></ListingDataFeed>'
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Origem do feed: responde 304 quando o ETag confere e às próximas 'forced_304' requisições."""
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        forced = server.forced_304 > 0
+        server.forced_304 -= forced
+        if forced or (server.etag and self.headers.get("If-None-Match") == server.etag):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if server.etag:
+            self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(server.body)))
+        self.end_headers()
+        self.wfile.write(server.body)
+
+    def log_message(self, *_args):
+        pass
+
+@pytest.fixture
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    server.body, server.etag, server.forced_304, server.requests = FEED, None, 0, []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/feed.xml"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(feed_cache, "FEED_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+def test_not_modified_reuses_the_cached_feed(origin):
+    origin.etag = '"v1"'
+    first = feed_cache.fetch_feed(origin.url)
+    second = feed_cache.fetch_feed(origin.url)
+
+    assert first["changed"] and first["status"] == 200
+    assert origin.requests[1].get("If-None-Match") == '"v1"'
+    assert second == {"path": first["path"], "changed": False, "status": 304, "bytes": 0, "sha256": first["sha256"]}
+    with open(second["path"], "rb") as f:
+        assert f.read() == FEED
+
+def test_same_content_without_validators_is_unchanged(origin):
+    first = feed_cache.fetch_feed(origin.url)
+    second = feed_cache.fetch_feed(origin.url)
+
+    assert "If-None-Match" not in origin.requests[1]
+    assert second["status"] == 200
+    assert not second["changed"]
+    assert second["sha256"] == first["sha256"]
+
+def test_not_modified_without_a_cache_downloads_again(origin, cache_dir):
+    origin.etag = '"v1"'
+    first = feed_cache.fetch_feed(origin.url)
+    (cache_dir / feed_cache.FEED_CACHE_FILENAME).unlink()
+    # A origem responde 304 mesmo sem validadores; a nova tentativa recebe 200.
+    origin.forced_304 = 1
+    result = feed_cache.fetch_feed(origin.url)
+
+    assert len(origin.requests) == 3
+    assert result["changed"] and result["status"] == 200
+    assert result["sha256"] == first["sha256"]
+    with open(result["path"], "rb") as f:
+        assert f.read() == FEED
+
+def test_not_modified_to_a_forced_request_is_an_error(origin):
+    origin.forced_304 = 2
+    with pytest.raises(requests.exceptions.HTTPError):
+        feed_cache.fetch_feed(origin.url)
+    assert len(origin.requests) == 2
+    assert not any("If-None-Match" in headers for headers in origin.requests)
@@ -0,0 +1,161 @@
+# tests/test_ghl_http.py
+
+from http.client import RemoteDisconnected
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from backend.services import ghl_http
+from backend.services.ghl_http import TokenBucket
+
+class FakeClock:
+    """Substitui time.monotonic/time.sleep do ghl_http: sleep só avança o relógio."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ghl_http.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(ghl_http.time, "sleep", fake.sleep)
+    return fake
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+# ==============================================================================
+# TOKEN BUCKET
+# ==============================================================================
+
+def test_bucket_allows_a_full_burst_without_waiting(clock):
+    bucket = TokenBucket(capacity=5, interval=10)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+    assert clock.slept == []
+
+def test_bucket_waits_for_refill_when_empty(clock):
+    bucket = TokenBucket(capacity=2, interval=10)  # 0,2 token/s
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket.acquire() == pytest.approx(5.0)
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(capacity=3, interval=3)
+    for _ in range(3):
+        bucket.acquire()
+    clock.now += 3600
+    assert [bucket.acquire() for _ in range(3)] == [0.0] * 3
+    assert bucket.acquire() > 0
+
+def test_bucket_pause_delays_next_request(clock):
+    bucket = TokenBucket(capacity=10, interval=10)
+    bucket.pause(4)
+    assert bucket.acquire() == pytest.approx(5.0)
+
+def test_bucket_follows_rate_limit_headers(clock):
+    bucket = TokenBucket(capacity=100, interval=10)
+    bucket.update_from_headers({
+        "X-RateLimit-Max": "20",
+        "X-RateLimit-Interval-Milliseconds": "2000",
+        "X-RateLimit-Remaining": "0",
+    })
+    assert bucket.capacity == 20
+    assert bucket.rate == pytest.approx(10.0)
+    assert bucket.acquire() == pytest.approx(0.1)
+
+def test_bucket_ignores_malformed_headers(clock):
+    bucket = TokenBucket(capacity=100, interval=10)
+    bucket.update_from_headers({"X-RateLimit-Max": "abc", "X-RateLimit-Interval-Milliseconds": "1000"})
+    assert bucket.capacity == 100
+
+def test_bucket_slows_down_as_daily_quota_runs_low(clock, monkeypatch):
+    monkeypatch.setattr(ghl_http, "DAILY_SLOWDOWN_BELOW", 1100)
+    monkeypatch.setattr(ghl_http, "DAILY_RESERVE", 100)
+    bucket = TokenBucket(capacity=100, interval=10)
+    bucket.update_from_headers({"X-RateLimit-Daily-Remaining": "5000"})
+    assert bucket.effective_rate() == pytest.approx(10.0)
+    bucket.update_from_headers({"X-RateLimit-Daily-Remaining": "600"})
+    assert bucket.effective_rate() == pytest.approx(5.0)
+    bucket.update_from_headers({"X-RateLimit-Daily-Remaining": "100"})
+    assert bucket.effective_rate() == pytest.approx(10.0 * ghl_http.DAILY_MIN_RATE_FACTOR)
+
+def test_bucket_blocks_at_daily_reserve_until_the_window_passes(clock, monkeypatch):
+    monkeypatch.setattr(ghl_http, "DAILY_RESERVE", 100)
+    monkeypatch.setattr(ghl_http, "DAILY_BLOCK_SECONDS", 60)
+    bucket = TokenBucket(capacity=100, interval=10)
+    assert not bucket.daily_blocked()
+    bucket.update_from_headers({"X-RateLimit-Daily-Remaining": "50"})
+    assert bucket.daily_blocked()
+    clock.now += 61
+    assert not bucket.daily_blocked()
+
+# ==============================================================================
+# POLÍTICA DE RETENTATIVAS
+# ==============================================================================
+
+@pytest.mark.parametrize("method, status, headers, expected", [
+    ("GET", 500, {}, True),
+    ("PUT", 502, {}, True),
+    ("GET", 404, {}, False),
+    ("POST", 429, {}, True),
+    ("POST", 500, {}, False),
+    ("POST", 503, {}, False),
+    ("POST", 503, {"Retry-After": "2"}, True),
+    ("POST", 400, {}, False),
+])
+def test_retry_policy_protects_non_idempotent_posts(method, status, headers, expected):
+    assert ghl_http._is_retryable(method, FakeResponse(status, headers)) is expected
+
+@pytest.mark.parametrize("status, expected", [(500, True), (503, True), (400, False), (401, False)])
+def test_retry_safe_posts_are_retried_like_idempotent_methods(status, expected):
+    assert ghl_http._is_retryable("POST", FakeResponse(status), retry_safe=True) is expected
+
+@pytest.mark.parametrize("exc, expected", [
+    (requests.exceptions.ConnectTimeout(), True),
+    (requests.exceptions.ConnectionError(MaxRetryError(None, "/", NewConnectionError(None, "recusada"))), True),
+    (requests.exceptions.ReadTimeout(), False),
+    (requests.exceptions.ConnectionError(ProtocolError("Connection aborted.", RemoteDisconnected("fechou"))), False),
+    (requests.exceptions.ConnectionError(MaxRetryError(None, "/", ProtocolError("Connection aborted."))), False),
+])
+def test_failed_before_sending(exc, expected):
+    assert ghl_http._failed_before_sending(exc) is expected
+
+class RaisingSession:
+    def __init__(self, exc):
+        self.exc = exc
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        raise self.exc
+
+@pytest.mark.parametrize("exc, retry_safe, expected_calls", [
+    (requests.exceptions.ConnectTimeout(), False, 3),
+    (requests.exceptions.ConnectionError(ProtocolError("Connection aborted.", RemoteDisconnected("fechou"))), False, 1),
+    (requests.exceptions.ReadTimeout(), False, 1),
+    (requests.exceptions.ReadTimeout(), True, 3),
+])
+def test_posts_are_only_resent_when_they_never_left(clock, monkeypatch, exc, retry_safe, expected_calls):
+    session = RaisingSession(exc)
+    monkeypatch.setattr(ghl_http, "get_session", lambda: session)
+    monkeypatch.setattr(ghl_http, "_buckets", {})
+    with pytest.raises(type(exc)):
+        ghl_http.ghl_request("POST", "https://api.example/oauth/locationToken", max_retries=2, retry_safe=retry_safe)
+    assert session.calls == expected_calls
+
+@pytest.mark.parametrize("status, expected", [
+    (ghl_http.NO_RESPONSE_STATUS, True), (429, True), (503, True), (400, False), (401, False), (None, False),
+])
+def test_transient_status(status, expected):
+    assert ghl_http.is_transient_status(status) is expected
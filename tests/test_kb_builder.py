@@ -0,0 +1,57 @@
+# tests/test_kb_builder.py
+
+import pytest
+
+from backend.services.kb_builder import IncrementalKnowledgeBaseBuilder, changeset_has_changes
+from backend.services.knowledge_base import categorize_listings, render_knowledge_bases
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / "kb_state.json")
+
+def build(state_file, records, save=True):
+    builder = IncrementalKnowledgeBaseBuilder(state_file)
+    result = builder.build(categorize_listings(records))
+    if save:
+        builder.save("feed-sha")
+    return builder, result
+
+def test_first_build_adds_everything_and_matches_full_render(state_file, make_record):
+    records = [make_record("1"), make_record("2", tipologia="Casa"), make_record("3")]
+    builder, result = build(state_file, records)
+    assert result["changeset"] == {"added": ["1", "3", "2"], "changed": [], "removed": [], "reordered": False}
+    resumida, completa = render_knowledge_bases(categorize_listings(records))
+    assert (result["base_resumida"], result["base_completa"]) == (resumida, completa)
+    assert builder.rendered == 3 and builder.reused == 0
+
+def test_unchanged_feed_reuses_every_line(state_file, make_record):
+    records = [make_record("1"), make_record("2")]
+    build(state_file, records)
+    builder, result = build(state_file, records)
+    assert not changeset_has_changes(result["changeset"])
+    assert builder.rendered == 0 and builder.reused == 2
+    assert builder.feed_sha256 == "feed-sha"
+
+def test_changed_added_and_removed_listings(state_file, make_record):
+    build(state_file, [make_record("1"), make_record("2"), make_record("3")])
+    _builder, result = build(state_file, [make_record("1", price="1"), make_record("3"), make_record("4")])
+    assert result["changeset"] == {"added": ["4"], "changed": ["1"], "removed": ["2"], "reordered": False}
+
+def test_position_change_only_is_reported_as_reorder(state_file, make_record):
+    build(state_file, [make_record("1"), make_record("2")])
+    _builder, result = build(state_file, [make_record("2"), make_record("1")])
+    changeset = result["changeset"]
+    assert changeset["reordered"] and not (changeset["added"] or changeset["changed"] or changeset["removed"])
+
+def test_state_is_only_persisted_by_save(state_file, make_record):
+    build(state_file, [make_record("1")], save=False)
+    _builder, result = build(state_file, [make_record("1")])
+    assert result["changeset"]["added"] == ["1"]
+
+def test_listings_without_id_are_rendered_but_not_tracked(state_file, make_record):
+    records = [make_record(None), make_record("1")]
+    build(state_file, records)
+    builder, result = build(state_file, records)
+    assert not changeset_has_changes(result["changeset"])
+    assert builder.rendered == 1
+    assert "ID_N/A" in result["base_resumida"]
@@ -0,0 +1,68 @@
+# tests/test_kb_shards.py
+
+import json
+
+from backend.services.kb_shards import (
+    split_into_shards, shard_knowledge_base, shard_names, _stale_shards, MANIFEST_SUFFIX,
+)
+from backend.services.sync_state import content_hash
+
+def make_base(ids, width=60):
+    return "\n".join(f"# {listing_id} = Imóvel {listing_id} - " + "x" * width for listing_id in ids)
+
+def changed_values(old: dict, new: dict) -> int:
+    return sum(1 for name, shard in new.items() if old.get(name) != shard) + sum(1 for name in old if name not in new)
+
+def test_shards_join_back_to_the_original_content():
+    content = make_base(range(1, 200))
+    shards = split_into_shards(content, max_bytes=2000, avg_lines=8)
+    assert len(shards) > 1
+    assert "\n".join(shards) == content
+
+def test_shards_respect_max_bytes_unless_a_single_line_is_larger():
+    content = make_base(range(1, 100)) + "\n# 999 = " + "y" * 5000
+    for shard in split_into_shards(content, max_bytes=1000, avg_lines=50):
+        assert len(shard.encode("utf-8")) <= 1000 or "\n" not in shard
+
+def test_empty_base_has_no_shards():
+    assert split_into_shards("", max_bytes=100, avg_lines=4) == []
+
+def test_shard_names_come_from_the_first_listing_id():
+    shards = ["# 12 = a\n# 13 = b", "# A-7/x = c", "linha livre", "# 12 = d"]
+    names = shard_names("base", shards)
+    assert names[:2] == ["base_shard_12", "base_shard_A-7x"]
+    assert names[2].startswith("base_shard_h")
+    assert names[3] == "base_shard_12-2"
+
+def test_removing_a_listing_touches_only_its_own_shard():
+    ids = list(range(1, 301))
+    before = shard_knowledge_base("base", make_base(ids), max_bytes=100_000, avg_lines=10)["shards"]
+    for removed in ids:
+        after = shard_knowledge_base("base", make_base([i for i in ids if i != removed]),
+                                     max_bytes=100_000, avg_lines=10)["shards"]
+        # A parte do imóvel muda; se ele abria a parte, ela também muda de nome (a antiga é esvaziada).
+        assert changed_values(before, after) <= 2
+
+def test_manifest_lists_shards_in_order_with_hashes():
+    content = make_base(range(1, 60))
+    sharded = shard_knowledge_base("base", content, max_bytes=1500, avg_lines=6)
+    manifest = json.loads(sharded["manifest"][f"base{MANIFEST_SUFFIX}"])
+    assert manifest["sha256"] == content_hash(content)
+    assert [entry["name"] for entry in manifest["shards"]] == list(sharded["shards"])
+    assert [entry["sha256"] for entry in manifest["shards"]] == [content_hash(s) for s in sharded["shards"].values()]
+
+def test_stale_shards_are_blanked_once():
+    synced = {"hash": "abc", "value_id": "1"}
+    state = {
+        "loc:base_shard_10": synced,          # ativa
+        "loc:base_shard_20": synced,          # saiu da base
+        "loc:base_shard_30": {"hash": content_hash(""), "value_id": "2"},  # já esvaziada
+        "loc:base": synced,                   # base inteira, publicada sem partes
+        "loc:base_03": synced,                # valor avulso que só termina em dígitos
+        "loc:base_manifest": synced,
+        "loc:outra_shard_40": synced,         # outra base
+        "loc:base_resumo": synced,            # valor avulso com o mesmo prefixo
+        "other:base_shard_50": synced,        # outra localização
+    }
+    stale = _stale_shards(state, "loc", ["base"], {"base_shard_10": "..."})
+    assert stale == {"base_shard_20": "", "base": ""}
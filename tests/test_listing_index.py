@@ -0,0 +1,75 @@
+# tests/test_listing_index.py
+
+import random
+
+import pytest
+
+from backend.services.knowledge_base import categorize_listings, render_knowledge_bases
+from backend.services.listing_index import ListingIndex, normalize_key, parse_filters
+
+NEIGHBORHOODS = ["América", "Glória", "Saguaçu", "Centro"]
+TIPOLOGIAS = ["Apartamento", "Casa", "Sobrado", "Terreno"]
+
+@pytest.fixture
+def records(make_record):
+    rng = random.Random(7)
+    return [
+        make_record(str(i), tipologia=rng.choice(TIPOLOGIAS), neighborhood=rng.choice(NEIGHBORHOODS),
+                    price=str(rng.choice([0, rng.randrange(100_000, 2_000_000, 1000)])),
+                    bedrooms=str(rng.randint(1, 4)))
+        for i in range(200)
+    ]
+
+def brute_force(index, category=None, neighborhood=None, min_price=None, max_price=None, bedrooms=None, min_bedrooms=None):
+    selected = []
+    for listing in index.listings:
+        if category is not None and listing.category != category:
+            continue
+        if neighborhood is not None and normalize_key(listing.neighborhood) != normalize_key(neighborhood):
+            continue
+        if (min_price is not None or max_price is not None) and listing.price is None:
+            continue
+        if min_price is not None and listing.price < min_price:
+            continue
+        if max_price is not None and listing.price > max_price:
+            continue
+        if bedrooms is not None and listing.bedrooms != bedrooms:
+            continue
+        if min_bedrooms is not None and (listing.bedrooms is None or listing.bedrooms < min_bedrooms):
+            continue
+        selected.append(listing)
+    # Mesma ordem das bases: categoria e, dentro dela, a ordem do feed.
+    return [listing.listing_id for listing in sorted(selected, key=lambda listing: index._base_order[listing.position])]
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"category": "casas"},
+    {"neighborhood": "saguacu"},
+    {"neighborhood": "América", "max_price": 800_000},
+    {"min_price": 500_000, "max_price": 1_500_000, "min_bedrooms": 3},
+    {"category": "apartamentos", "bedrooms": 2},
+    {"category": "inexistente"},
+])
+def test_query_matches_a_brute_force_filter(records, filters):
+    index = ListingIndex(records)
+    assert [listing.listing_id for listing in index.query(**filters)] == brute_force(index, **filters)
+
+def test_price_on_request_is_excluded_from_price_filters(make_record):
+    index = ListingIndex([make_record("1", price="0"), make_record("2", price="300000"), make_record("3", price="")])
+    assert [listing.price for listing in index.listings] == [None, 300000.0, None]
+    assert [listing.listing_id for listing in index.query(max_price=800_000)] == ["2"]
+    assert len(index.query()) == 3
+
+def test_full_view_renders_the_same_bases(records):
+    index = ListingIndex(records)
+    assert index.render_view(index.query()) == render_knowledge_bases(categorize_listings(records))
+    assert index.categories() == categorize_listings(records)
+
+def test_parse_filters():
+    assert parse_filters("neighborhood=América; max_price=800000;bedrooms=2") == {
+        "neighborhood": "América", "max_price": 800000.0, "bedrooms": 2,
+    }
+    with pytest.raises(ValueError):
+        parse_filters("color=azul")
+    with pytest.raises(ValueError):
+        parse_filters("bedrooms=dois")
@@ -0,0 +1,84 @@
+# tests/test_snapshot.py
+
+import os
+
+import pytest
+
+from backend.services import snapshot as snapshot_module
+from backend.services.listing_index import ListingIndex
+from backend.services.snapshot import Snapshot, diff_snapshots, save_snapshot, list_snapshots, snapshot_from_records
+
+@pytest.fixture
+def write(tmp_path):
+    def _write(name, records):
+        path = str(tmp_path / f"{name}.snap")
+        snapshot_from_records(path, records)
+        return path
+    return _write
+
+def test_round_trip_preserves_records_and_columns(write, make_record):
+    records = [
+        make_record("10", description="<p>Texto com acentuação ✓</p>", descriptionText="Texto com acentuação ✓"),
+        make_record("2", price="0", neighborhood=None),
+        make_record(None, tipologia="Casa"),
+    ]
+    with Snapshot(write("a", records)) as snapshot:
+        assert len(snapshot) == 3
+        assert [snapshot.record(position) for position in range(3)] == records
+        assert snapshot.column("price")[0] == 500000.0
+        assert snapshot.column("price")[1] is None
+        assert snapshot.column("neighborhood")[1] is None
+        assert snapshot.column("category")[2] == "casas"
+
+def test_records_without_description_do_not_carry_it(write, make_record):
+    record = make_record("1", descriptionText="limpo")
+    with Snapshot(write("a", [record])) as snapshot:
+        light = snapshot.record(0, with_description=False)
+    assert "description" not in light and "descriptionText" not in light
+    assert light["title"] == record["title"]
+
+def test_find_uses_the_listing_id_index(write, make_record):
+    records = [make_record(listing_id) for listing_id in ("30", "4", "100", "25")] + [make_record(None)]
+    with Snapshot(write("a", records)) as snapshot:
+        assert [snapshot.find(listing_id) for listing_id in ("30", "4", "100", "25")] == [0, 1, 2, 3]
+        assert snapshot.find("5") is None
+
+def test_empty_snapshot(write):
+    with Snapshot(write("a", [])) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.find("1") is None
+
+def test_diff_reports_added_removed_changed_and_price_changes(write, make_record):
+    old = [make_record("1"), make_record("2"), make_record("3", price="100000")]
+    new = [make_record("1"), make_record("3", price="120000"), make_record("4"),
+           make_record("2", description="Nova descrição.")]
+    with Snapshot(write("old", old)) as before, Snapshot(write("new", new)) as after:
+        diff = diff_snapshots(before, after)
+    assert diff == {
+        "added": ["4"],
+        "removed": [],
+        "changed": ["3", "2"],
+        "price_changes": [{"listingID": "3", "old": 100000.0, "new": 120000.0}],
+    }
+
+def test_diff_of_identical_snapshots_is_empty(write, make_record):
+    records = [make_record(str(i)) for i in range(20)]
+    with Snapshot(write("a", records)) as a, Snapshot(write("b", records[::-1])) as b:
+        assert diff_snapshots(a, b) == {"added": [], "removed": [], "changed": [], "price_changes": []}
+
+def test_diff_lists_removed_listings(write, make_record):
+    with Snapshot(write("old", [make_record("1"), make_record("2")])) as before, \
+            Snapshot(write("new", [make_record("2")])) as after:
+        assert diff_snapshots(before, after)["removed"] == ["1"]
+
+def test_save_snapshot_keeps_only_the_newest(tmp_path, make_record, monkeypatch):
+    # Os nomes têm resolução de milissegundos: cada gravação avança o relógio em 1 ms.
+    ticks = iter(range(4))
+    monkeypatch.setattr(snapshot_module.time, "time", lambda: 1_700_000_000 + next(ticks) / 1000)
+    directory = str(tmp_path / "snapshots")
+    listings = ListingIndex([make_record("1")]).listings
+    paths = [save_snapshot(listings, directory, keep=2) for _ in range(4)]
+    assert len(set(paths)) == 4
+    assert list_snapshots(directory) == paths[-2:]
+    # Hora UTC, independente do fuso da máquina.
+    assert [os.path.basename(path) for path in paths[-2:]] == ["20231114-221320-002.snap", "20231114-221320-003.snap"]